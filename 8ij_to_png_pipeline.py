@@ -6,12 +6,22 @@ Properly handles the .8ij format with JPEG-compressed frames.
 
 import os
 import sys
+import json
+import time
+import mmap
+import queue
 import struct
 import argparse
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import numpy as np
 from PIL import Image
 
+from frame_store import (FrameStoreWriter, compress_frame, STORE_SUFFIX, CODECS as STORE_CODECS,
+                         DEFAULT_CHUNK_FRAMES, DEFAULT_CODEC)
+
 try:
     import imagecodecs
     HAVE_IMAGECODECS = True
@@ -19,155 +29,1485 @@ except ImportError:
     HAVE_IMAGECODECS = False
     print("Warning: imagecodecs not available, some 12-bit JPEGs may not decode properly")
 
-def decode_12bit_jpeg(jpeg_data):
-    """Decode a 12-bit JPEG using imagecodecs."""
+# .8ij frame layout:
+# - 4 bytes: Frame ID "8IJ1"
+# - 4 bytes: Frame size (uint32, little-endian)
+# - 4 bytes: Frame index (uint32, little-endian)
+# - N bytes: Raw JPEG data (12-bit JPEG)
+FRAME_ID = b'8IJ1'
+FRAME_HEADER_SIZE = 12  # 4 + 4 + 4 bytes
+
+# Sidecar frame index written next to each .8ij (e.g. "take.8ij.idx")
+INDEX_SUFFIX = '.idx'
+INDEX_VERSION = 1
+
+# One entry per frame: frame index from the header, byte offset of the JPEG
+# payload within the .8ij, and payload size in bytes
+FrameEntry = namedtuple('FrameEntry', ['index', 'offset', 'size'])
+
+def scan_frame_index(input_path):
+    """
+    Walk the 12-byte frame headers of a .8ij file without reading any JPEG data.
+
+    Returns (entries, stop_reason, incomplete) where entries is a list of
+    FrameEntry, incomplete is the FrameEntry of a truncated tail frame (or
+    None) and stop_reason is one of:
+    - 'eof': every byte of the file belongs to a complete frame
+    - 'short_header': trailing bytes too short to hold a frame header
+    - 'bad_frame_id': a header without the "8IJ1" marker was found
+    - 'incomplete_frame': the last frame's JPEG data is truncated
+    """
+    input_path = Path(input_path)
+    file_size = input_path.stat().st_size
+    entries = []
+    stop_reason = 'eof'
+    incomplete = None
+
+    with open(input_path, 'rb') as f:
+        offset = 0
+        while offset < file_size:
+            f.seek(offset)
+            header = f.read(FRAME_HEADER_SIZE)
+            if len(header) < FRAME_HEADER_SIZE:
+                stop_reason = 'short_header'
+                break
+
+            if header[0:4] != FRAME_ID:
+                stop_reason = 'bad_frame_id'
+                break
+
+            frame_size, frame_index = struct.unpack('<II', header[4:12])
+            data_offset = offset + FRAME_HEADER_SIZE
+            if data_offset + frame_size > file_size:
+                # Recorded so callers can report it, but never handed out for decoding
+                stop_reason = 'incomplete_frame'
+                incomplete = FrameEntry(frame_index, data_offset, frame_size)
+                break
+
+            entries.append(FrameEntry(frame_index, data_offset, frame_size))
+            offset = data_offset + frame_size
+
+    return entries, stop_reason, incomplete
+
+def get_index_path(input_path):
+    """Return the sidecar index path for a .8ij file."""
+    input_path = Path(input_path)
+    return input_path.with_name(input_path.name + INDEX_SUFFIX)
+
+def load_frame_index(input_path, rebuild=False, verbose=False):
+    """
+    Load the frame index for a .8ij file, building and caching it on first use.
+
+    The sidecar is only reused while the source file size and mtime match the
+    values recorded in it, so re-captured or appended files are rescanned.
+    Returns a dict with 'frames' (list of FrameEntry), 'stop_reason' and
+    'incomplete' (FrameEntry of a truncated tail frame, or None).
+    """
+    input_path = Path(input_path)
+    index_path = get_index_path(input_path)
+    stat = input_path.stat()
+
+    if not rebuild and index_path.exists():
+        try:
+            with open(index_path, 'r') as f:
+                cached = json.load(f)
+            if (cached.get('version') == INDEX_VERSION and
+                    cached.get('source_size') == stat.st_size and
+                    cached.get('source_mtime_ns') == stat.st_mtime_ns):
+                incomplete = cached.get('incomplete')
+                return {
+                    'frames': [FrameEntry(*entry) for entry in cached['frames']],
+                    'stop_reason': cached['stop_reason'],
+                    'incomplete': FrameEntry(*incomplete) if incomplete else None,
+                }
+            if verbose:
+                print(f"  Frame index out of date, rescanning: {index_path.name}")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if verbose:
+                print(f"  Warning: Ignoring unreadable frame index {index_path}: {e}")
+
+    entries, stop_reason, incomplete = scan_frame_index(input_path)
+    index = {
+        'frames': entries,
+        'stop_reason': stop_reason,
+        'incomplete': incomplete,
+    }
+
+    try:
+        with open(index_path, 'w') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'source_size': stat.st_size,
+                'source_mtime_ns': stat.st_mtime_ns,
+                'stop_reason': stop_reason,
+                'incomplete': list(incomplete) if incomplete else None,
+                'frames': [list(entry) for entry in entries],
+            }, f)
+    except OSError as e:
+        # Read-only capture storage: keep working with the in-memory index
+        if verbose:
+            print(f"  Warning: Could not write frame index {index_path}: {e}")
+
+    return index
+
+class EijFile:
+    """
+    Random-access reader for a .8ij file backed by its frame index.
+
+    The file is memory-mapped and frames are returned as memoryview slices of
+    the mapping, so JPEG payloads reach the decoder without per-frame copies.
+    Release (or drop) returned memoryviews before closing the reader.
+
+    Usage:
+        with EijFile('take.8ij') as eij:
+            jpeg_data = eij.read_frame(4000)
+    """
+
+    def __init__(self, input_path, rebuild_index=False, verbose=False):
+        self.path = Path(input_path)
+        index = load_frame_index(self.path, rebuild=rebuild_index, verbose=verbose)
+        self.frames = index['frames']
+        self.stop_reason = index['stop_reason']
+        self.incomplete = index['incomplete']
+        self._by_index = {entry.index: entry for entry in self.frames}
+
+        self._mmap = None
+        self._view = None
+        with open(self.path, 'rb') as f:
+            # mmap cannot map an empty file; such a file simply has no frames
+            if self.frames:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, frame_index):
+        return frame_index in self._by_index
+
+    def __iter__(self):
+        """Yield (FrameEntry, memoryview of JPEG data) in file order."""
+        for entry in self.frames:
+            yield entry, self.read_entry(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A caller still holds a frame slice; the mapping is unmapped once it is released
+                pass
+            self._mmap = None
+
+    @property
+    def frame_indices(self):
+        """Frame indices in file order."""
+        return [entry.index for entry in self.frames]
+
+    def get_entry(self, frame_index):
+        """Look up the FrameEntry for a frame index from the .8ij headers."""
+        try:
+            return self._by_index[frame_index]
+        except KeyError:
+            raise KeyError(f"Frame {frame_index} not found in {self.path}") from None
+
+    def read_entry(self, entry):
+        """Return the raw JPEG data for a FrameEntry as a zero-copy memoryview."""
+        return self._view[entry.offset:entry.offset + entry.size]
+
+    def read_frame(self, frame_index):
+        """Seek straight to a frame by its index and return its raw JPEG data."""
+        return self.read_entry(self.get_entry(frame_index))
+
+class FrameSelection:
+    """
+    Set of frame indices given as slices and/or single indices.
+
+    Parsed from specs like '4000:4100', '::10', '0:200:2,500,750:' (STOP is
+    exclusive, any part of START:STOP:STEP may be omitted). Supports `in`.
+    """
+
+    def __init__(self, ranges=(), indices=()):
+        self.ranges = list(ranges)      # (start, stop or None, step)
+        self.indices = set(indices)
+
+    @classmethod
+    def parse(cls, spec):
+        ranges = []
+        indices = []
+        for part in str(spec).split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if ':' in part:
+                fields = part.split(':')
+                if len(fields) > 3:
+                    raise ValueError(f"Invalid frame range: {part}")
+                fields += [''] * (3 - len(fields))
+                start = int(fields[0]) if fields[0] else 0
+                stop = int(fields[1]) if fields[1] else None
+                step = int(fields[2]) if fields[2] else 1
+                if start < 0 or (stop is not None and stop < 0) or step < 1:
+                    raise ValueError(f"Invalid frame range: {part}")
+                ranges.append((start, stop, step))
+            else:
+                index = int(part)
+                if index < 0:
+                    raise ValueError(f"Invalid frame index: {part}")
+                indices.append(index)
+        if not ranges and not indices:
+            raise ValueError(f"Empty frame selection: {spec!r}")
+        return cls(ranges, indices)
+
+    def __contains__(self, frame_index):
+        if frame_index in self.indices:
+            return True
+        for start, stop, step in self.ranges:
+            if frame_index >= start and (stop is None or frame_index < stop) \
+                    and (frame_index - start) % step == 0:
+                return True
+        return False
+
+    def __repr__(self):
+        parts = [f"{start}:{'' if stop is None else stop}:{step}" for start, stop, step in self.ranges]
+        parts += [str(index) for index in sorted(self.indices)]
+        return f"FrameSelection('{','.join(parts)}')"
+
+def as_frame_filter(frames):
+    """Normalize a frames argument (None, spec string, range, FrameSelection or iterable) for `in` tests."""
+    if frames is None or isinstance(frames, (FrameSelection, range, set, frozenset)):
+        return frames
+    if isinstance(frames, str):
+        return FrameSelection.parse(frames)
+    return set(frames)
+
+def split_frame_ranges(input_path, shards, frames=None, rebuild_index=False):
+    """
+    Split the (selected) frames of a .8ij file into up to `shards` contiguous
+    runs of roughly equal JPEG payload size, using the cached frame index.
+
+    Returns a list of (frame filter, frame count, payload bytes), one per
+    non-empty run, in file order. Each filter can be passed as the frames
+    argument of process_8ij_file to convert only that run, e.g. from
+    separate processes.
+    """
+    wanted = as_frame_filter(frames)
+    entries = [entry for entry in load_frame_index(input_path, rebuild=rebuild_index)['frames']
+               if wanted is None or entry.index in wanted]
+    total_bytes = sum(entry.size for entry in entries)
+
+    runs = []
+    start = 0
+    run_bytes = 0
+    closed_bytes = 0
+    for position, entry in enumerate(entries):
+        run_bytes += entry.size
+        # Close the run once the runs so far hold their share of the bytes
+        target = total_bytes * (len(runs) + 1) / shards
+        if len(runs) < shards - 1 and closed_bytes + run_bytes >= target:
+            runs.append((entries[start:position + 1], position + 1 - start, run_bytes))
+            closed_bytes += run_bytes
+            start = position + 1
+            run_bytes = 0
+    if start < len(entries):
+        runs.append((entries[start:], len(entries) - start, run_bytes))
+
+    # Explicit index sets rather than ranges: frame indices may reset or jump
+    # backwards within a capture, so a run's first..last span can miss frames
+    return [(frozenset(entry.index for entry in run), count, run_bytes)
+            for run, count, run_bytes in runs]
+
+def frame_selection_arg(value):
+    """argparse type for --frames."""
+    try:
+        return FrameSelection.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+# JPEG start-of-frame markers (baseline, extended, progressive, lossless, ...)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def jpeg_frame_info(jpeg_data):
+    """
+    Read (precision, height, width, components) from a JPEG's start-of-frame
+    header without decoding or copying it. Returns None if no SOF header is found.
+    """
+    if bytes(jpeg_data[:2]) != b'\xff\xd8':
+        return None
+    pos = 2
+    while pos + 4 <= len(jpeg_data):
+        if jpeg_data[pos] != 0xFF:
+            return None
+        marker = jpeg_data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte
+            pos += 1
+            continue
+        if marker in SOF_MARKERS:
+            if pos + 10 > len(jpeg_data):
+                return None
+            return struct.unpack_from('>BHHB', jpeg_data, pos + 4)
+        pos += 2 + struct.unpack_from('>H', jpeg_data, pos + 2)[0]
+    return None
+
+# Reduced-resolution decode factors (JPEG DCT scaling works in powers of two up to 1/8)
+DECODE_SCALES = (1, 2, 4, 8)
+
+def decode_scale_arg(value):
+    """argparse type for --scale: 1, 2, 4 or 8."""
+    try:
+        scale = int(value)
+    except ValueError:
+        scale = None
+    if scale not in DECODE_SCALES:
+        raise argparse.ArgumentTypeError(f"Decode scale must be one of {', '.join(map(str, DECODE_SCALES))}")
+    return scale
+
+# Whether imagecodecs honours the scaled output shape, probed on first use
+_scaled_decode = None
+
+def scaled_decode_supported():
+    """
+    True if imagecodecs decodes 12-bit JPEGs at reduced size with DCT scaling.
+
+    Some builds accept but ignore the shape option and always decode in full.
+    The answer is probed once with a tiny 12-bit JPEG and cached.
+    """
+    global _scaled_decode
+    if _scaled_decode is None:
+        try:
+            probe = imagecodecs.jpeg_encode(np.zeros((16, 16), dtype=np.uint16), level=90)
+            _scaled_decode = imagecodecs.jpeg_decode(probe, shape=(8, 8)).shape[:2] == (8, 8)
+        except Exception:
+            _scaled_decode = False
+    return _scaled_decode
+
+def pick_decode_scale(width, height, min_size):
+    """
+    Largest decode scale that keeps a width x height frame at least min_size (w, h).
+
+    Always 1 if the decoder can't do DCT-scaled decodes: a full decode plus
+    reduce_frame is slower than the full decode alone.
+    """
+    if not HAVE_IMAGECODECS or not scaled_decode_supported():
+        return 1
+    best = 1
+    for scale in DECODE_SCALES:
+        if -(-width // scale) >= min_size[0] and -(-height // scale) >= min_size[1]:
+            best = scale
+    return best
+
+def reduce_frame(img_array, scale):
+    """
+    Downscale a frame by an integer factor, averaging scale x scale blocks.
+
+    The result is ceil(height / scale) x ceil(width / scale), the size JPEG
+    DCT scaling gives: partial blocks on the bottom and right edges average
+    the pixels they have.
+    """
+    in_height, in_width = img_array.shape[:2]
+    height = -(-in_height // scale)
+    width = -(-in_width // scale)
+    # Summing strided views is several times faster than a reshape + sum over axes
+    total = np.zeros((height, width) + img_array.shape[2:], dtype=np.uint32)
+    for row in range(scale):
+        for col in range(scale):
+            view = img_array[row::scale, col::scale]
+            total[:view.shape[0], :view.shape[1]] += view
+
+    full_height = in_height // scale
+    full_width = in_width // scale
+    edge_rows = in_height - full_height * scale
+    edge_cols = in_width - full_width * scale
+    total[:full_height, :full_width] //= scale * scale
+    if edge_rows:
+        total[full_height:, :full_width] //= edge_rows * scale
+    if edge_cols:
+        total[:full_height, full_width:] //= scale * edge_cols
+    if edge_rows and edge_cols:
+        total[full_height:, full_width:] //= edge_rows * edge_cols
+    return total.astype(img_array.dtype)
+
+def decode_12bit_jpeg(jpeg_data, scale=1):
+    """
+    Decode a 12-bit JPEG using imagecodecs.
+
+    scale > 1 (2, 4 or 8) decodes at 1/scale resolution, rounded up. Where
+    the decoder supports it (see scaled_decode_supported) this uses DCT
+    scaling, which skips most of the IDCT work. Otherwise the frame is
+    decoded in full and block-averaged down to the same size, which costs
+    a little more than the full decode.
+    """
     if not HAVE_IMAGECODECS:
         raise ImportError("imagecodecs is required for 12-bit JPEG support")
 
     try:
-        # Decode 12-bit JPEG
-        img_array = imagecodecs.jpeg_decode(jpeg_data)
+        info = jpeg_frame_info(jpeg_data) if scale > 1 and scaled_decode_supported() else None
+        if info is None:
+            # Decode 12-bit JPEG
+            img_array = imagecodecs.jpeg_decode(jpeg_data)
+        else:
+            shape = (-(-info[1] // scale), -(-info[2] // scale))
+            img_array = imagecodecs.jpeg_decode(jpeg_data, shape=shape)
+        if scale > 1 and (info is None or img_array.shape[0] > -(-info[1] // scale)):
+            img_array = reduce_frame(img_array, scale)
         return img_array
     except Exception as e:
         print(f"    Warning: Failed to decode JPEG: {e}")
         return None
 
-def convert_12bit_to_8bit(img_array, method='linear'):
+# 12-bit input domain: every possible sample value gets one LUT entry
+LUT_SIZE = 4096
+MAX_12BIT = LUT_SIZE - 1
+
+SCALING_METHODS = ['linear', 'auto', 'percentile', 'gamma', 'log']
+DEFAULT_GAMMA = 2.2           # 'gamma' curve: out = in ** (1 / gamma)
+DEFAULT_LOG_STRENGTH = 100.0  # 'log' curve: out = log1p(k * in) / log1p(k)
+
+def parse_scaling_method(method):
+    """
+    Split a scaling method into (name, parameter).
+
+    Curve methods accept an optional parameter after a colon, e.g. 'gamma:2.4'
+    or 'log:50'. Callables (custom curves) are returned unchanged.
+    """
+    if callable(method):
+        return method, None
+
+    name, _, param = str(method).partition(':')
+    if name not in SCALING_METHODS or (param and name not in ('gamma', 'log')):
+        raise ValueError(f"Unknown conversion method: {method}")
+    try:
+        param = float(param) if param else None
+    except ValueError:
+        raise ValueError(f"Invalid parameter for {name} scaling: {param}") from None
+    return name, param
+
+def scaling_method_arg(value):
+    """argparse type for --scaling: validates names like 'percentile' or 'gamma:2.4'."""
+    try:
+        parse_scaling_method(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+    return value
+
+# Samples per np.bincount call; bounds the intp copy bincount makes of its input
+HISTOGRAM_CHUNK = 1 << 20
+
+def as_lut_index(img_array):
+    """
+    Return img_array as unsigned samples of at most 16 bits, usable as LUT or
+    bincount indices. Float, signed and wider integer input is clipped to
+    0-4095 and converted (negative samples would wrap, and a 32/64-bit range
+    can't be covered by a table); uint8/uint16 input is returned unchanged.
+    """
+    if np.issubdtype(img_array.dtype, np.unsignedinteger) and img_array.dtype.itemsize <= 2:
+        return img_array
+    return np.clip(img_array, 0, MAX_12BIT).astype(np.uint16)
+
+def compute_histogram(img_array):
+    """
+    Count every 12-bit level in an image in one pass.
+
+    Returns an int64 array of LUT_SIZE bins; samples above 4095 are counted
+    in the top bin. The histogram can be passed back to build_tone_lut /
+    convert_12bit_to_8bit or exposure_stats to avoid another pass.
+    """
+    samples = np.ascontiguousarray(as_lut_index(img_array)).reshape(-1)
+
+    hist = np.zeros(LUT_SIZE, dtype=np.int64)
+    for start in range(0, samples.size, HISTOGRAM_CHUNK):
+        counts = np.bincount(samples[start:start + HISTOGRAM_CHUNK], minlength=LUT_SIZE)
+        if len(counts) > LUT_SIZE:
+            counts[MAX_12BIT] += counts[LUT_SIZE:].sum()
+        hist += counts[:LUT_SIZE]
+    return hist
+
+def histogram_percentile(hist, q):
+    """
+    Exact q-th percentile (0-100) of the samples counted in hist.
+
+    Matches np.percentile's default linear interpolation on the raw samples.
+    """
+    cumulative = np.cumsum(hist)
+    count = int(cumulative[-1])
+    if count == 0:
+        raise ValueError("Cannot take a percentile of an empty histogram")
+
+    # Same virtual index and interpolation as numpy's 'linear' method
+    virtual_index = (count - 1) * (q / 100.0)
+    lower = int(np.floor(virtual_index))
+    fraction = virtual_index - lower
+    if virtual_index >= count - 1:
+        lower = upper = count - 1
+    else:
+        upper = lower + 1
+
+    # The k-th smallest sample (0-based) is the first level whose cumulative count exceeds k
+    below = int(np.searchsorted(cumulative, lower, side='right'))
+    above = int(np.searchsorted(cumulative, upper, side='right'))
+    difference = above - below
+    if fraction >= 0.5:
+        return above - difference * (1 - fraction)
+    return below + difference * fraction
+
+def histogram_bounds(hist, method):
+    """Return the (low, high) input levels an 'auto' or 'percentile' scale maps to 0-255."""
+    if method == 'auto':
+        populated = np.flatnonzero(hist)
+        if len(populated) == 0:
+            return 0.0, 0.0
+        return float(populated[0]), float(populated[-1])
+    if method == 'percentile':
+        return histogram_percentile(hist, 2), histogram_percentile(hist, 98)
+    raise ValueError(f"Unknown conversion method: {method}")
+
+def exposure_stats(hist):
+    """Summarize a frame (or sequence) histogram for exposure QA."""
+    total = int(hist.sum())
+    if total == 0:
+        return {'samples': 0}
+    low, high = histogram_bounds(hist, 'auto')
+    return {
+        'samples': total,
+        'min': low,
+        'max': high,
+        'mean': float(np.dot(np.arange(LUT_SIZE), hist) / total),
+        'p2': histogram_percentile(hist, 2),
+        'median': histogram_percentile(hist, 50),
+        'p98': histogram_percentile(hist, 98),
+        'black_fraction': float(hist[0] / total),
+        'clipped_fraction': float(hist[MAX_12BIT] / total),
+    }
+
+def tone_sequence_arg(value):
+    """argparse type for --tone-sequence: 'global' or a positive window length."""
+    if value == 'global':
+        return value
+    try:
+        window = int(value)
+    except ValueError:
+        window = 0
+    if window < 1:
+        raise argparse.ArgumentTypeError(f"expected 'global' or a positive frame count, got {value!r}")
+    return window
+
+def build_tone_lut(method='linear', img_array=None, hist=None):
+    """
+    Compile a scaling method into a 4096-entry uint8 lookup table.
+
+    'auto' and 'percentile' derive their bounds from hist, or from img_array
+    when no histogram is given. A callable method is a custom curve: it
+    receives the 12-bit levels normalized to 0-1 (float64) and must return
+    values in 0-1.
+    """
+    name, param = parse_scaling_method(method)
+    levels = np.arange(LUT_SIZE)
+
+    if callable(name):
+        curve = np.asarray(name(levels / MAX_12BIT), dtype=np.float64)
+        return np.clip(np.round(curve * 255.0), 0, 255).astype(np.uint8)
+
+    if name == 'linear':
+        # Linear scaling from 12-bit range (0-4095) to 8-bit (0-255)
+        # This preserves original brightness levels as-is
+        return (levels.astype(np.float32) * (255.0 / 4095.0)).astype(np.uint8)
+
+    if name == 'gamma':
+        gamma = param or DEFAULT_GAMMA
+        curve = (levels / MAX_12BIT) ** (1.0 / gamma)
+        return np.round(curve * 255.0).astype(np.uint8)
+
+    if name == 'log':
+        strength = param or DEFAULT_LOG_STRENGTH
+        curve = np.log1p(strength * levels / MAX_12BIT) / np.log1p(strength)
+        return np.round(curve * 255.0).astype(np.uint8)
+
+    if hist is None and img_array is None:
+        raise ValueError(f"'{name}' scaling needs image data to compute its bounds")
+
+    if hist is None and name == 'auto':
+        # Auto-scale based on actual min/max values; a plain reduction is
+        # cheaper than building a histogram nobody else will reuse
+        low = float(np.min(img_array))
+        high = float(np.max(img_array))
+    else:
+        # 'percentile' scales on the 2-98 percentile range (robust to outliers)
+        if hist is None:
+            hist = compute_histogram(img_array)
+        low, high = histogram_bounds(hist, name)
+
+    if high > low:
+        return np.clip((levels - low) * (255.0 / (high - low)), 0, 255).astype(np.uint8)
+    return np.zeros(LUT_SIZE, dtype=np.uint8)
+
+def apply_tone_lut(img_array, lut):
+    """Map image samples through a tone LUT; values above 4095 saturate, negative values map to 0."""
+    img_array = as_lut_index(img_array)
+
+    # Pad the table to the full range of the input dtype so out-of-range
+    # samples cannot index past it (64 KB at most, for uint16)
+    dtype_levels = int(np.iinfo(img_array.dtype).max) + 1
+    if dtype_levels > len(lut):
+        lut = np.concatenate([lut, np.full(dtype_levels - len(lut), lut[-1], dtype=np.uint8)])
+
+    # Fancy indexing rather than np.take: np.take first casts the whole index
+    # array to intp (8 bytes per pixel), indexing buffers that cast in chunks
+    return lut[img_array]
+
+def convert_12bit_to_8bit(img_array, method='linear', lut=None, hist=None):
     """
     Convert 12-bit image data to 8-bit for PNG output.
 
+    Every method is compiled into a 4096-entry LUT (see build_tone_lut) and
+    applied in a single lookup, so no float copy of the frame is made.
+    Pass a prebuilt lut to reuse it across frames, or a histogram from
+    compute_histogram to skip the statistics pass for 'auto'/'percentile'.
+
     Methods:
     - 'linear': Simple linear scaling (keeps original brightness as-is)
     - 'auto': Auto-scale based on actual min/max
     - 'percentile': Scale based on 2-98 percentile range
+    - 'gamma[:g]': Gamma curve, out = in ** (1/g) (default g=2.2)
+    - 'log[:k]': Log curve, out = log1p(k*in) / log1p(k) (default k=100)
+    - callable: Custom curve on 0-1 normalized levels
     """
-    if method == 'linear':
-        # Linear scaling from 12-bit range (0-4095) to 8-bit (0-255)
-        # This preserves original brightness levels as-is
-        img_8bit = (img_array.astype(np.float32) * (255.0 / 4095.0)).astype(np.uint8)
-
-    elif method == 'auto':
-        # Auto-scale based on actual min/max values
-        min_val = np.min(img_array)
-        max_val = np.max(img_array)
-        if max_val > min_val:
-            img_8bit = ((img_array - min_val) * (255.0 / (max_val - min_val))).astype(np.uint8)
-        else:
-            img_8bit = np.zeros_like(img_array, dtype=np.uint8)
-
-    elif method == 'percentile':
-        # Scale based on percentile range (robust to outliers)
-        p2 = np.percentile(img_array, 2)
-        p98 = np.percentile(img_array, 98)
-        if p98 > p2:
-            img_8bit = np.clip((img_array - p2) * (255.0 / (p98 - p2)), 0, 255).astype(np.uint8)
+    if lut is None:
+        lut = build_tone_lut(method, img_array, hist)
+    return apply_tone_lut(img_array, lut)
+
+def bounded_map(fn, items, threads=1, depth=None):
+    """
+    Yield fn(*item) for each item, in input order.
+
+    With threads > 1 (or an explicit depth) the calls run on a thread pool
+    with at most depth (default 2 * threads) items in flight, so read-ahead
+    stays bounded.
+    """
+    if threads <= 1 and not depth:
+        for item in items:
+            yield fn(*item)
+        return
+
+    threads = max(threads, 1)
+    depth = depth or threads * 2
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, *item))
+            if len(pending) >= depth:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class MemoryBudget:
+    """
+    Byte budget shared by pipeline stages; acquire() blocks while the bytes
+    in flight would exceed the cap. A request is always granted when nothing
+    is held, so a single oversized frame cannot deadlock the pipeline.
+    """
+
+    def __init__(self, cap=None):
+        self.cap = cap
+        self.held = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes, stop=None):
+        """Reserve nbytes; returns False if stop was set while waiting."""
+        with self._cond:
+            while (self.cap and self.held and self.held + nbytes > self.cap and
+                   not (stop and stop.is_set())):
+                self._cond.wait(QUEUE_POLL)
+            self.held += nbytes
+            return not (stop and stop.is_set())
+
+    def release(self, nbytes):
+        with self._cond:
+            self.held -= nbytes
+            self._cond.notify_all()
+
+# Seconds between stop checks while a pipeline stage waits on a queue
+QUEUE_POLL = 0.1
+_STAGE_DONE = object()
+
+def _queue_put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=QUEUE_POLL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _queue_get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=QUEUE_POLL)
+        except queue.Empty:
+            pass
+    return _STAGE_DONE
+
+def memory_cap_arg(value):
+    """argparse type for --memory-cap: megabytes in, bytes out."""
+    try:
+        megabytes = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid memory cap: {value}") from None
+    if megabytes <= 0:
+        raise argparse.ArgumentTypeError(f"Memory cap must be positive, got {value}")
+    return int(megabytes * 1024 * 1024)
+
+def payload_bytes(value):
+    """Bytes held by a pipeline stage value: an array/buffer or a tuple containing them."""
+    if isinstance(value, tuple):
+        return sum(payload_bytes(v) for v in value)
+    if isinstance(value, (np.ndarray, memoryview)):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return 0
+
+def staged_map(items, read, decode, write, decoders=1, writers=1, depth=None, memory_cap=None):
+    """
+    Run items through three concurrent stages and yield write() results as
+    they complete (not in input order):
+
+        reader thread --read(*item)--> [decode queue] --decoders x decode()-->
+        [write queue] --writers x write()--> results
+
+    Each queue holds at most depth items (default 2 * decoders). With
+    memory_cap (bytes), the reader also waits while read + decoded data in
+    flight would exceed the cap; the size of a decoded frame is estimated
+    from the largest one seen so far.
+
+    read, decode and write take and return one value each (read gets the
+    item unpacked). The first exception in any stage stops the pipeline and
+    is re-raised here.
+    """
+    depth = depth or max(decoders, 1) * 2
+    decode_queue = queue.Queue(maxsize=depth)
+    write_queue = queue.Queue(maxsize=depth)
+    results = queue.Queue()
+    stop = threading.Event()
+    budget = MemoryBudget(memory_cap)
+    decoded_estimate = [0]
+    decoders_left = [decoders]
+    lock = threading.Lock()
+
+    def reader():
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                data = read(*item)
+                # Reserve room for this frame's decoded form as well as its payload
+                cost = payload_bytes(data) + decoded_estimate[0]
+                if not budget.acquire(cost, stop) or not _queue_put(decode_queue, (data, cost), stop):
+                    break
+        except BaseException as e:
+            results.put(e)
+            stop.set()
+        finally:
+            for _ in range(decoders):
+                _queue_put(decode_queue, _STAGE_DONE, stop)
+
+    def decoder():
+        try:
+            while True:
+                job = _queue_get(decode_queue, stop)
+                if job is _STAGE_DONE:
+                    break
+                data, cost = job
+                decoded = decode(data)
+                size = payload_bytes(decoded)
+                if size > decoded_estimate[0]:
+                    decoded_estimate[0] = size
+                if not _queue_put(write_queue, (decoded, cost), stop):
+                    break
+        except BaseException as e:
+            results.put(e)
+            stop.set()
+        finally:
+            with lock:
+                decoders_left[0] -= 1
+                last = decoders_left[0] == 0
+            if last:
+                for _ in range(writers):
+                    _queue_put(write_queue, _STAGE_DONE, stop)
+
+    def writer():
+        try:
+            while True:
+                job = _queue_get(write_queue, stop)
+                if job is _STAGE_DONE:
+                    break
+                decoded, cost = job
+                try:
+                    results.put(write(decoded))
+                finally:
+                    budget.release(cost)
+        except BaseException as e:
+            results.put(e)
+            stop.set()
+        finally:
+            results.put(_STAGE_DONE)
+
+    workers = [threading.Thread(target=reader, name='8ij-reader', daemon=True)]
+    workers += [threading.Thread(target=decoder, name=f'8ij-decode-{i}', daemon=True) for i in range(decoders)]
+    workers += [threading.Thread(target=writer, name=f'8ij-write-{i}', daemon=True) for i in range(writers)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        writers_left = writers
+        while writers_left:
+            value = results.get()
+            if value is _STAGE_DONE:
+                writers_left -= 1
+            elif isinstance(value, BaseException):
+                raise value
+            else:
+                yield value
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+# Per-frame histograms cached next to each .8ij (e.g. "take.8ij.hist.npy")
+HISTOGRAM_SUFFIX = '.hist.npy'
+
+def get_histogram_path(input_path):
+    """Return the sidecar per-frame histogram path for a .8ij file."""
+    input_path = Path(input_path)
+    return input_path.with_name(input_path.name + HISTOGRAM_SUFFIX)
+
+def load_sequence_histograms(eij, threads=1, rebuild=False, verbose=False):
+    """
+    Return per-frame 12-bit histograms for every frame of an open EijFile.
+
+    The result is a (frames, 4096) uint32 array, row i belonging to
+    eij.frames[i]; frames that fail to decode get an all-zero row. It is
+    computed with one decode pass and cached as <name>.8ij.hist.npy, which
+    is memory-mapped on later runs so repeat conversions skip the pass.
+    """
+    hist_path = get_histogram_path(eij.path)
+
+    if not rebuild and hist_path.exists():
+        try:
+            if hist_path.stat().st_mtime_ns >= eij.path.stat().st_mtime_ns:
+                hists = np.load(hist_path, mmap_mode='r')
+                if hists.shape == (len(eij), LUT_SIZE):
+                    return hists
+            if verbose:
+                print(f"  Sequence histograms out of date, recomputing: {hist_path.name}")
+        except (OSError, ValueError) as e:
+            if verbose:
+                print(f"  Warning: Ignoring unreadable histograms {hist_path}: {e}")
+
+    def frame_histogram(jpeg_data):
+        try:
+            img_array = decode_12bit_jpeg(jpeg_data)
+        finally:
+            jpeg_data.release()
+        if img_array is None:
+            return np.zeros(LUT_SIZE, dtype=np.uint32)
+        return compute_histogram(img_array).astype(np.uint32)
+
+    if verbose:
+        print(f"  Computing sequence statistics over {len(eij)} frames")
+
+    hists = np.zeros((len(eij), LUT_SIZE), dtype=np.uint32)
+    items = ((jpeg_data,) for _, jpeg_data in eij)
+    for position, hist in enumerate(bounded_map(frame_histogram, items, threads)):
+        hists[position] = hist
+
+    # Write under a temporary name so an interrupted run never leaves a short cache
+    tmp_path = hist_path.with_name(hist_path.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, hists)
+        os.replace(tmp_path, hist_path)
+    except OSError as e:
+        if verbose:
+            print(f"  Warning: Could not write sequence histograms {hist_path}: {e}")
+
+    return hists
+
+def iter_sequence_luts(hists, method, window=None):
+    """
+    Yield one tone LUT per frame from per-frame histograms.
+
+    window=None applies a single LUT built from the whole sequence. An
+    integer window builds each frame's LUT from the summed histograms of the
+    window frames centered on it, which follows slow exposure changes without
+    per-frame flicker.
+    """
+    frame_count = len(hists)
+    if not window:
+        total = np.zeros(LUT_SIZE, dtype=np.int64)
+        for start in range(0, frame_count, 1024):
+            total += hists[start:start + 1024].sum(axis=0, dtype=np.int64)
+        lut = build_tone_lut(method, hist=total) if total.any() else None
+        for _ in range(frame_count):
+            yield lut
+        return
+
+    # Running sum over rows [low, high) of the centered window
+    running = np.zeros(LUT_SIZE, dtype=np.int64)
+    low = high = 0
+    for position in range(frame_count):
+        new_low = max(0, position - window // 2)
+        new_high = min(frame_count, new_low + window)
+        while high < new_high:
+            running += hists[high]
+            high += 1
+        while low < new_low:
+            running -= hists[low]
+            low += 1
+        yield build_tone_lut(method, hist=running) if running.any() else None
+
+def select_frame_luts(eij, scaling_method, tone_sequence=None, threads=1, rebuild=False,
+                      verbose=False):
+    """
+    Return an iterator of tone LUTs aligned with eij.frames.
+
+    A None entry means the LUT must be built from the frame itself (per-frame
+    'auto'/'percentile'). See process_8ij_file for tone_sequence.
+    """
+    frame_dependent = parse_scaling_method(scaling_method)[0] in ('auto', 'percentile')
+    if frame_dependent and tone_sequence:
+        hists = load_sequence_histograms(eij, threads, rebuild=rebuild, verbose=verbose)
+        window = None if tone_sequence == 'global' else int(tone_sequence)
+        return iter_sequence_luts(hists, scaling_method, window)
+
+    if tone_sequence and verbose:
+        print(f"  Note: tone sequence has no effect on {scaling_method} scaling")
+    # Methods that don't depend on frame content share one LUT for the whole file
+    static_lut = None if frame_dependent else build_tone_lut(scaling_method)
+    return (static_lut for _ in eij.frames)
+
+def iter_frames(input_path, frames=None, scaling='linear', threads=1, readahead=None,
+                tone_sequence=None, rebuild_index=False, verbose=False, scale=1):
+    """
+    Lazily decode frames from a .8ij file, yielding (frame_index, ndarray).
+
+    - frames: optional frame selection (see as_frame_filter); file order is kept
+    - scaling: any scaling method accepted by convert_12bit_to_8bit, giving
+      uint8 frames, or None for the raw decoded 12-bit data
+    - threads: decode/scale frames on this many threads
+    - readahead: max frames decoded ahead of the consumer (default 2 * threads)
+    - scale: decode at 1/scale resolution (2, 4 or 8, see decode_12bit_jpeg)
+
+    Frames that fail to decode are skipped. The file stays open until the
+    generator is exhausted or closed.
+    """
+    wanted = as_frame_filter(frames)
+
+    with EijFile(input_path, rebuild_index=rebuild_index, verbose=verbose) as eij:
+        if scaling is None:
+            luts = (None for _ in eij.frames)
         else:
-            img_8bit = np.zeros_like(img_array, dtype=np.uint8)
+            luts = select_frame_luts(eij, scaling, tone_sequence, threads, rebuild_index, verbose)
+
+        def decode(entry, jpeg_data, lut):
+            try:
+                img_array = decode_12bit_jpeg(jpeg_data, scale)
+            finally:
+                jpeg_data.release()
+            if img_array is not None and scaling is not None:
+                img_array = convert_12bit_to_8bit(img_array, method=scaling, lut=lut)
+            return entry.index, img_array
+
+        def selected():
+            for (entry, jpeg_data), lut in zip(eij, luts):
+                if wanted is None or entry.index in wanted:
+                    yield entry, jpeg_data, lut
+                else:
+                    jpeg_data.release()
+
+        for frame_index, img_array in bounded_map(decode, selected(), threads, readahead):
+            if img_array is not None:
+                yield frame_index, img_array
+
+class ExtractionResult:
+    """Outcome of process_8ij_file for one .8ij; truthy when the file was processed."""
+
+    def __init__(self, input_path, success=False, frames_written=0, frames_failed=0,
+                 frames_skipped=0, bytes_read=0, bytes_written=0, index_time=0.0, elapsed=0.0,
+                 error=''):
+        self.input_path = str(input_path)
+        self.success = success
+        self.frames_written = frames_written
+        self.frames_failed = frames_failed
+        self.frames_skipped = frames_skipped    # Already present from an earlier run
+        self.bytes_read = bytes_read            # JPEG payload bytes decoded
+        self.bytes_written = bytes_written      # Encoded output bytes on disk
+        self.index_time = index_time            # Seconds spent loading/building the frame index
+        self.elapsed = elapsed                  # Total wall-clock seconds for the file
+        self.error = error
+
+    @classmethod
+    def combine(cls, input_path, results):
+        """
+        Merge the results of converting parts of one file (e.g. frame range
+        shards); elapsed becomes the summed worker time.
+        """
+        if len(results) == 1:
+            return results[0]
+        combined = cls(input_path, success=all(results))
+        for result in results:
+            combined.frames_written += result.frames_written
+            combined.frames_failed += result.frames_failed
+            combined.frames_skipped += result.frames_skipped
+            combined.bytes_read += result.bytes_read
+            combined.bytes_written += result.bytes_written
+            combined.index_time = max(combined.index_time, result.index_time)
+            combined.elapsed += result.elapsed
+        combined.error = '\n'.join(result.error for result in results if result.error)
+        return combined
+
+    def __bool__(self):
+        return self.success
+
+    @property
+    def complete(self):
+        """True when every selected frame is now on disk."""
+        return self.success and self.frames_failed == 0
+
+    def __repr__(self):
+        return (f"ExtractionResult({self.input_path!r}, success={self.success}, "
+                f"frames_written={self.frames_written}, elapsed={self.elapsed:.2f})")
+
+# Output encoders: name -> (file extension, default parameter)
+# - png:   8-bit PNG, parameter is the zlib compress level 0-9 (PIL default 6)
+# - png16: 16-bit PNG of the unscaled 12-bit data, parameter is the compress level
+# - tiff:  uncompressed 8-bit TIFF
+# - qoi:   8-bit QOI (fast lossless, via imagecodecs)
+# - webp:  8-bit lossless WebP (via imagecodecs)
+# - jpeg:  8-bit JPEG proxy, parameter is the quality 1-100
+OUTPUT_FORMATS = {
+    'png': ('.png', 6),
+    'png16': ('.png', 6),
+    'tiff': ('.tif', None),
+    'qoi': ('.qoi', None),
+    'webp': ('.webp', None),
+    'jpeg': ('.jpg', 90),
+}
+
+def parse_output_format(output_format):
+    """Split an output format like 'png:1' or 'jpeg:80' into (name, parameter)."""
+    name, _, param = str(output_format).partition(':')
+    if name not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    default = OUTPUT_FORMATS[name][1]
+    if not param:
+        return name, default
+    if default is None:
+        raise ValueError(f"{name} output takes no parameter")
+    try:
+        value = int(param)
+    except ValueError:
+        raise ValueError(f"Invalid parameter for {name} output: {param}") from None
+    valid = range(0, 10) if name in ('png', 'png16') else range(1, 101)
+    if value not in valid:
+        raise ValueError(f"{name} parameter must be in {valid.start}-{valid.stop - 1}, got {value}")
+    return name, value
+
+def output_format_arg(value):
+    """argparse type for --format."""
+    try:
+        parse_output_format(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+    return value
+
+def get_frame_extension(output_format):
+    """File extension (with dot) written for an output format."""
+    return OUTPUT_FORMATS[parse_output_format(output_format)[0]][0]
 
+def to_12bit_as_16bit(img_array):
+    """Widen 12-bit samples to the full 16-bit range by bit replication (4095 -> 65535)."""
+    img_array = img_array.astype(np.uint16, copy=False)
+    return (img_array << 4) | (img_array >> 8)
+
+def encode_frame(img_array, output_path, output_format='png'):
+    """
+    Write one frame in the given output format.
+
+    img_array is the 8-bit scaled frame for every format except png16, which
+    takes the raw 12-bit data. Returns True if the frame was written.
+    """
+    name, param = parse_output_format(output_format)
+
+    if len(img_array.shape) not in (2, 3):
+        print(f"  Warning: Unexpected image shape: {img_array.shape}")
+        return False
+
+    if name == 'png16':
+        data = imagecodecs.png_encode(to_12bit_as_16bit(img_array), level=param)
+    elif name in ('qoi', 'webp'):
+        # Both codecs only take RGB(A); expand grayscale frames
+        if len(img_array.shape) == 2:
+            img_array = np.stack([img_array] * 3, axis=-1)
+        if name == 'qoi':
+            data = imagecodecs.qoi_encode(np.ascontiguousarray(img_array))
+        else:
+            data = imagecodecs.webp_encode(img_array, lossless=True)
     else:
-        raise ValueError(f"Unknown conversion method: {method}")
+        # Handle color vs grayscale
+        if len(img_array.shape) == 2:
+            # Grayscale
+            img = Image.fromarray(img_array, mode='L')
+        elif img_array.shape[2] == 3:
+            # Color (RGB)
+            img = Image.fromarray(img_array, mode='RGB')
+        else:
+            # Convert to RGB if needed
+            img = Image.fromarray(img_array)
 
-    return img_8bit
+        if name == 'png':
+            img.save(output_path, 'PNG', compress_level=param)
+        elif name == 'tiff':
+            img.save(output_path, 'TIFF', compression=None)
+        else:
+            img.save(output_path, 'JPEG', quality=param)
+        return True
+
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return True
 
-def process_8ij_file(input_path, output_dir, scaling_method='linear', verbose=False):
+def decode_output_frame(jpeg_data, scaling_method='linear', lut=None, output_format='png', scale=1):
     """
-    Process a single .8ij file and extract all frames as PNG.
+    Decode one 12-bit JPEG frame (at 1/scale resolution) into the array
+    encode_frame expects for output_format: 8-bit scaled, or the raw 12-bit
+    data for png16. Returns None if decoding failed.
+    """
+    # Decode 12-bit JPEG
+    img_array = decode_12bit_jpeg(jpeg_data, scale)
+    if img_array is None or parse_output_format(output_format)[0] == 'png16':
+        return img_array
 
-    Frame structure in .8ij:
-    - 4 bytes: Frame ID "8IJ1"
-    - 4 bytes: Frame size (uint32, little-endian)
-    - 4 bytes: Frame index (uint32, little-endian)
-    - N bytes: Raw JPEG data (12-bit JPEG)
+    # Convert 12-bit to 8-bit
+    return convert_12bit_to_8bit(img_array, method=scaling_method, lut=lut)
+
+def process_8ij_file(input_path, output_dir, scaling_method='linear', verbose=False,
+                     rebuild_index=False, threads=1, tone_sequence=None, frames=None,
+                     skip_existing=False, output_format='png', writers=0, queue_depth=None,
+                     memory_cap=None, scale=1):
     """
-    FRAME_ID = b'8IJ1'
-    FRAME_HEADER_SIZE = 12  # 4 + 4 + 4 bytes
+    Process a single .8ij file and extract all frames as PNG (or another
+    output_format, see OUTPUT_FORMATS).
+
+    Frames are written atomically (temporary name, then rename). With
+    skip_existing, frames whose output file already exists are not decoded
+    again, which lets an interrupted conversion resume where it stopped.
+
+    frames restricts extraction to a subset of frame indices (a FrameSelection,
+    spec string like '0:200:10', or any collection); other frames' JPEG data
+    is never touched.
+
+    Frame offsets come from the sidecar index (see load_frame_index), so
+    repeat runs over the same capture skip the header scan entirely.
 
+    With threads > 1, frames are decoded, scaled and encoded concurrently
+    (JPEG decode and PNG encode release the GIL). At most 2 * threads frames
+    are in flight at once, and output names depend only on the frame index.
+
+    With writers > 0, reading, decoding and encoding run as separate stages
+    instead (see staged_map): one reader thread pulls JPEG data off disk,
+    threads decoder threads decode and scale, and writers threads encode and
+    write, connected by queues of queue_depth frames. memory_cap (bytes)
+    bounds the frame data held between stages.
+
+    scale > 1 writes frames at 1/scale resolution, decoded with JPEG DCT
+    scaling where the decoder supports it (see decode_12bit_jpeg).
+
+    tone_sequence applies to 'auto' and 'percentile' scaling: None computes
+    bounds per frame, 'global' uses one LUT from the whole file's histogram,
+    and an integer uses a rolling window of that many frames (see
+    iter_sequence_luts). Sequence statistics are cached next to the file.
+
+    Returns an ExtractionResult (truthy on success) with frame, byte and
+    timing counters for the file.
+    """
     input_path = Path(input_path)
     output_dir = Path(output_dir)
+    result = ExtractionResult(input_path)
+    start_time = time.perf_counter()
+    wanted = as_frame_filter(frames)
+    raw = parse_output_format(output_format)[0] == 'png16'
 
     if not input_path.exists():
         print(f"Error: {input_path} does not exist")
-        return False
+        result.error = f"{input_path} does not exist"
+        return result
 
     # Create output directory
     output_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"Processing: {input_path}")
 
+    def extract(entry, jpeg_data, lut):
+        """Returns (entry, bytes written), with 0 bytes if the frame was skipped."""
+        try:
+            img_array = decode_output_frame(jpeg_data, scaling_method, lut, output_format, scale)
+        finally:
+            jpeg_data.release()
+        return write((entry, img_array))
+
+    def write(decoded):
+        entry, img_array = decoded
+        if img_array is None:
+            return entry, 0
+        output_path = output_dir / frame_name(entry)
+        # Write under a temporary name so a frame file only ever exists once
+        # complete; resumed runs can then trust any frame already on disk
+        tmp_path = output_dir / f".{output_path.name}.tmp"
+        if not encode_frame(img_array, tmp_path, output_format):
+            return entry, 0
+        os.replace(tmp_path, output_path)
+        return entry, output_path.stat().st_size
+
+    # Stage functions for staged_map (writers > 0)
+    def read(entry, jpeg_data, lut):
+        # Copying out of the mmap is where the disk read actually happens
+        try:
+            return entry, bytes(jpeg_data), lut
+        finally:
+            jpeg_data.release()
+
+    def decode(job):
+        entry, jpeg_bytes, lut = job
+        return entry, decode_output_frame(jpeg_bytes, scaling_method, lut, output_format, scale)
+
+    extension = get_frame_extension(output_format)
+
+    def frame_name(entry):
+        return f"{input_path.stem}_frame_{entry.index:06d}{extension}"
+
+    def record(entry, bytes_written):
+        result.bytes_read += entry.size
+        if bytes_written:
+            result.frames_written += 1
+            result.bytes_written += bytes_written
+        else:
+            result.frames_failed += 1
+
     try:
-        with open(input_path, 'rb') as f:
-            file_size = input_path.stat().st_size
-            bytes_read = 0
-            frames_extracted = 0
-
-            while bytes_read < file_size:
-                # Read frame header
-                header = f.read(FRAME_HEADER_SIZE)
-                if len(header) < FRAME_HEADER_SIZE:
-                    break
+        with EijFile(input_path, rebuild_index=rebuild_index, verbose=verbose) as eij:
+            result.index_time = time.perf_counter() - start_time
 
-                bytes_read += FRAME_HEADER_SIZE
+            # Raw 12-bit output is never tone mapped, so skip any sequence statistics pass
+            if raw:
+                luts = (None for _ in eij.frames)
+            else:
+                luts = select_frame_luts(eij, scaling_method, tone_sequence, threads, rebuild_index, verbose)
 
-                # Parse header
-                frame_id = header[0:4]
-                if frame_id != FRAME_ID:
-                    if verbose:
-                        print(f"  Warning: Invalid frame ID at offset {bytes_read - FRAME_HEADER_SIZE}")
-                    break
+            # One directory listing instead of a stat per frame
+            existing = set(os.listdir(output_dir)) if skip_existing else ()
 
-                frame_size = struct.unpack('<I', header[4:8])[0]
-                frame_index = struct.unpack('<I', header[8:12])[0]
+            def frames_to_extract():
+                position = 0
+                for (entry, jpeg_data), lut in zip(eij, luts):
+                    if wanted is not None and entry.index not in wanted:
+                        jpeg_data.release()
+                        continue
+                    if frame_name(entry) in existing:
+                        jpeg_data.release()
+                        result.frames_skipped += 1
+                        continue
+                    if verbose and position % 10 == 0:
+                        print(f"  Processing frame {entry.index}: {entry.size} bytes")
+                    position += 1
+                    yield entry, jpeg_data, lut
 
-                if verbose and frames_extracted % 10 == 0:
-                    print(f"  Processing frame {frame_index}: {frame_size} bytes")
+            if writers:
+                extracted = staged_map(frames_to_extract(), read, decode, write, max(threads, 1), writers,
+                                       queue_depth, memory_cap)
+            else:
+                extracted = bounded_map(extract, frames_to_extract(), threads)
+            for entry, bytes_written in extracted:
+                record(entry, bytes_written)
 
-                # Read JPEG data
-                jpeg_data = f.read(frame_size)
-                if len(jpeg_data) < frame_size:
-                    print(f"  Warning: Incomplete frame {frame_index}")
-                    break
+            if eij.stop_reason == 'bad_frame_id' and verbose:
+                end_offset = eij.frames[-1].offset + eij.frames[-1].size if eij.frames else 0
+                print(f"  Warning: Invalid frame ID at offset {end_offset}")
+            elif eij.stop_reason == 'incomplete_frame':
+                print(f"  Warning: Incomplete frame {eij.incomplete.index}")
 
-                bytes_read += frame_size
+        result.success = True
+        skipped_note = f" ({result.frames_skipped} already done)" if result.frames_skipped else ""
+        print(f"  ✓ Extracted {result.frames_written} frames to {output_dir}{skipped_note}")
 
-                # Decode 12-bit JPEG
-                img_array = decode_12bit_jpeg(jpeg_data)
-                if img_array is None:
-                    continue
+    except Exception as e:
+        result.error = str(e)
+        print(f"  ✗ Error processing {input_path}: {e}")
+
+    result.elapsed = time.perf_counter() - start_time
+    return result
+
+def get_store_path(input_path, output_dir):
+    """Frame store directory for a .8ij file (e.g. "out/take1.frames")."""
+    return Path(output_dir) / (Path(input_path).stem + STORE_SUFFIX)
+
+def process_8ij_to_store(input_path, output_dir, scaling_method='linear', verbose=False,
+                         rebuild_index=False, threads=1, tone_sequence=None, frames=None,
+                         output_format='png', chunk_frames=DEFAULT_CHUNK_FRAMES, codec=DEFAULT_CODEC,
+                         scale=1):
+    """
+    Extract a .8ij file into one chunked frame store (see frame_store.py)
+    instead of one image file per frame.
+
+    Frames are stored as 8-bit scaled arrays, or as the raw 12-bit data
+    (uint16) when output_format is png16. Each frame is compressed on its own
+    so FrameStore can still read any single frame; with threads > 1 decode,
+    scaling and compression run concurrently. Other arguments are as for
+    process_8ij_file.
+
+    Returns an ExtractionResult; bytes_written is the total compressed size.
+    """
+    input_path = Path(input_path)
+    store_path = get_store_path(input_path, output_dir)
+    result = ExtractionResult(input_path)
+    start_time = time.perf_counter()
+    wanted = as_frame_filter(frames)
+    raw = parse_output_format(output_format)[0] == 'png16'
+
+    if not input_path.exists():
+        print(f"Error: {input_path} does not exist")
+        result.error = f"{input_path} does not exist"
+        return result
+
+    print(f"Processing: {input_path}")
+
+    def compress(entry, jpeg_data, lut):
+        """Returns (entry, compressed frame, shape, dtype), with None data if decoding failed."""
+        try:
+            img_array = decode_12bit_jpeg(jpeg_data, scale)
+        finally:
+            jpeg_data.release()
+        if img_array is None:
+            return entry, None, None, None
+        if raw:
+            img_array = img_array.astype(np.uint16, copy=False)
+        else:
+            img_array = convert_12bit_to_8bit(img_array, method=scaling_method, lut=lut)
+        return entry, compress_frame(img_array, codec), img_array.shape, img_array.dtype
+
+    try:
+        with EijFile(input_path, rebuild_index=rebuild_index, verbose=verbose) as eij, \
+             FrameStoreWriter(store_path, chunk_frames, codec, source=input_path.name) as writer:
+            result.index_time = time.perf_counter() - start_time
+
+            if raw:
+                luts = (None for _ in eij.frames)
+            else:
+                luts = select_frame_luts(eij, scaling_method, tone_sequence, threads, rebuild_index, verbose)
 
-                # Convert 12-bit to 8-bit
-                img_8bit = convert_12bit_to_8bit(img_array, method=scaling_method)
-
-                # Handle color vs grayscale
-                if len(img_8bit.shape) == 2:
-                    # Grayscale
-                    img = Image.fromarray(img_8bit, mode='L')
-                elif len(img_8bit.shape) == 3:
-                    # Color (RGB)
-                    if img_8bit.shape[2] == 3:
-                        img = Image.fromarray(img_8bit, mode='RGB')
+            def frames_to_store():
+                for (entry, jpeg_data), lut in zip(eij, luts):
+                    if wanted is None or entry.index in wanted:
+                        yield entry, jpeg_data, lut
                     else:
-                        # Convert to RGB if needed
-                        img = Image.fromarray(img_8bit)
-                else:
-                    print(f"  Warning: Unexpected image shape: {img_8bit.shape}")
+                        jpeg_data.release()
+
+            for entry, data, shape, dtype in bounded_map(compress, frames_to_store(), threads):
+                result.bytes_read += entry.size
+                if data is None:
+                    result.frames_failed += 1
                     continue
+                writer.add_compressed(entry.index, data, shape, dtype)
+                result.frames_written += 1
+                result.bytes_written += len(data)
 
-                # Save as PNG
-                output_name = f"{input_path.stem}_frame_{frame_index:06d}.png"
-                output_path = output_dir / output_name
-                img.save(output_path, 'PNG')
+            if eij.stop_reason == 'incomplete_frame':
+                print(f"  Warning: Incomplete frame {eij.incomplete.index}")
 
-                frames_extracted += 1
-
-        print(f"  ✓ Extracted {frames_extracted} frames to {output_dir}")
-        return True
+        result.success = True
+        print(f"  ✓ Stored {result.frames_written} frames in {store_path} "
+              f"({result.bytes_written / 1e6:.1f} MB, {codec})")
 
     except Exception as e:
+        result.error = str(e)
         print(f"  ✗ Error processing {input_path}: {e}")
+
+    result.elapsed = time.perf_counter() - start_time
+    return result
+
+# Conversion manifest kept at the root of an output tree
+MANIFEST_NAME = '.8ij_manifest.json'
+MANIFEST_VERSION = 1
+
+def load_manifest(output_dir, name=MANIFEST_NAME):
+    """
+    Load the conversion manifest of an output tree.
+
+    Maps each source path (relative to the input root) to its size, mtime,
+    conversion settings, frame counts and whether every frame is done.
+    Independent runs sharing one output tree keep separate manifests by name.
+    """
+    manifest_path = Path(output_dir) / name
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable manifest {manifest_path}: {e}")
+    return {'version': MANIFEST_VERSION, 'files': {}}
+
+def save_manifest(output_dir, manifest, name=MANIFEST_NAME):
+    """Atomically write the conversion manifest of an output tree."""
+    manifest_path = Path(output_dir) / name
+    tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def manifest_entry(source_path, settings, result=None):
+    """Build a manifest entry for a source file, from its ExtractionResult once finished."""
+    stat = Path(source_path).stat()
+    entry = {
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'settings': settings,
+        'complete': False,
+    }
+    if result is not None:
+        entry.update({
+            'complete': result.complete,
+            'frames_done': result.frames_written + result.frames_skipped,
+            'frames_failed': result.frames_failed,
+            'elapsed': round(result.elapsed, 3),
+        })
+    return entry
+
+def manifest_entry_matches(entry, source_path, settings):
+    """True if a manifest entry describes this exact source file and settings."""
+    if not entry:
         return False
+    stat = Path(source_path).stat()
+    return (entry.get('source_size') == stat.st_size and
+            entry.get('source_mtime_ns') == stat.st_mtime_ns and
+            entry.get('settings') == settings)
 
-def process_directory(input_dir, output_dir, scaling_method='linear', preserve_structure=True, verbose=False):
-    """Process all .8ij files in a directory."""
+def process_directory(input_dir, output_dir, scaling_method='linear', preserve_structure=True, verbose=False,
+                      rebuild_index=False, threads=1, tone_sequence=None, frames=None, output_format='png',
+                      store=False, chunk_frames=DEFAULT_CHUNK_FRAMES, codec=DEFAULT_CODEC, writers=0,
+                      queue_depth=None, memory_cap=None, scale=1):
+    """Process all .8ij files in a directory (into frame stores with store=True)."""
     input_dir = Path(input_dir)
     output_dir = Path(output_dir)
 
@@ -198,25 +1538,61 @@ def process_directory(input_dir, output_dir, scaling_method='linear', preserve_s
             file_output_dir = output_dir
 
         # Process the file
-        success = process_8ij_file(eij_file, file_output_dir, scaling_method, verbose)
-
-        if success:
-            # Count frames in output directory
-            png_files = list(file_output_dir.glob(f"{eij_file.stem}_frame_*.png"))
-            total_frames += len(png_files)
+        if store:
+            result = process_8ij_to_store(eij_file, file_output_dir, scaling_method, verbose, rebuild_index,
+                                          threads, tone_sequence, frames, output_format, chunk_frames, codec,
+                                          scale)
+        else:
+            result = process_8ij_file(eij_file, file_output_dir, scaling_method, verbose, rebuild_index,
+                                      threads, tone_sequence, frames, output_format=output_format,
+                                      writers=writers, queue_depth=queue_depth, memory_cap=memory_cap,
+                                      scale=scale)
+        total_frames += result.frames_written
 
     print(f"\nTotal frames extracted: {total_frames}")
     print(f"Output saved to: {output_dir}")
 
 def main():
-    parser = argparse.ArgumentParser(description='Convert .8ij files directly to PNG')
+    parser = argparse.ArgumentParser(description='Convert .8ij files directly to PNG (or other image formats)')
     parser.add_argument('input', help='Input .8ij file or directory')
-    parser.add_argument('output', help='Output directory for PNG files')
-    parser.add_argument('--scaling', choices=['linear', 'auto', 'percentile'],
-                       default='linear',
-                       help='Brightness scaling method (default: linear, keeps brightness as-is)')
+    parser.add_argument('output', help='Output directory for extracted frames')
+    parser.add_argument('--scaling', type=scaling_method_arg, default='linear',
+                       help='Brightness scaling method: linear, auto, percentile, gamma[:G] or log[:K] '
+                            '(default: linear, keeps brightness as-is)')
+    parser.add_argument('--format', type=output_format_arg, default='png',
+                       help='Output format: png[:LEVEL], png16[:LEVEL] (unscaled 12-bit), tiff, qoi, webp '
+                            '(lossless) or jpeg[:QUALITY] (default: png, compress level 6)')
+    parser.add_argument('--tone-sequence', type=tone_sequence_arg, default=None,
+                       help="For auto/percentile scaling: 'global' for one tone curve per file, "
+                            "or N for a rolling N-frame window (default: per frame)")
+    parser.add_argument('--frames', type=frame_selection_arg, default=None,
+                       help='Frame indices to extract: START:STOP:STEP ranges and/or single indices, '
+                            'comma-separated (e.g. 4000:4100 or ::10 or 5,17,200:400)')
+    parser.add_argument('--scale', type=decode_scale_arg, default=1,
+                       help='Decode frames at 1/2, 1/4 or 1/8 resolution (2, 4 or 8) using JPEG DCT '
+                            'scaling where supported, else a full decode averaged down '
+                            '(default: 1, full resolution)')
+    parser.add_argument('--store', action='store_true',
+                       help='Write each file into one chunked frame store ({stem}.frames/) instead of '
+                            'one image per frame; --format png16 stores the unscaled 12-bit data')
+    parser.add_argument('--store-chunk', type=int, default=DEFAULT_CHUNK_FRAMES,
+                       help=f'Frames per store chunk file (default: {DEFAULT_CHUNK_FRAMES})')
+    parser.add_argument('--store-codec', choices=STORE_CODECS, default=DEFAULT_CODEC,
+                       help=f'Per-frame compression in the store (default: {DEFAULT_CODEC})')
     parser.add_argument('--preserve-structure', action='store_true',
                        help='Preserve directory structure in output')
+    parser.add_argument('--threads', type=int, default=1,
+                       help='Frames to decode/encode concurrently within each file (default: 1)')
+    parser.add_argument('--writers', type=int, default=0,
+                       help='Encoder/writer threads; > 0 splits each file into reader, decoder '
+                            '(--threads) and writer stages connected by bounded queues (default: 0)')
+    parser.add_argument('--queue-depth', type=int, default=None,
+                       help='Frames queued between pipeline stages (default: 2 * threads)')
+    parser.add_argument('--memory-cap', type=memory_cap_arg, default=None,
+                       help='Max MB of frame data held between pipeline stages (default: unlimited)')
+    parser.add_argument('--rebuild-index', action='store_true',
+                       help='Rescan frame headers and sequence statistics instead of reusing '
+                            'the cached .8ij.idx / .8ij.hist.npy sidecars')
     parser.add_argument('-v', '--verbose', action='store_true',
                        help='Verbose output')
 
@@ -224,13 +1600,24 @@ def main():
 
     input_path = Path(args.input)
 
-    if input_path.is_file():
+    if input_path.is_file() and args.store:
+        # Process single file into a frame store
+        process_8ij_to_store(input_path, args.output, args.scaling, args.verbose, args.rebuild_index,
+                             args.threads, args.tone_sequence, args.frames, args.format,
+                             args.store_chunk, args.store_codec, args.scale)
+    elif input_path.is_file():
         # Process single file
-        process_8ij_file(input_path, args.output, args.scaling, args.verbose)
+        process_8ij_file(input_path, args.output, args.scaling, args.verbose, args.rebuild_index,
+                         args.threads, args.tone_sequence, args.frames, output_format=args.format,
+                         writers=args.writers, queue_depth=args.queue_depth, memory_cap=args.memory_cap,
+                         scale=args.scale)
     elif input_path.is_dir():
         # Process directory
         process_directory(input_path, args.output, args.scaling,
-                        args.preserve_structure, args.verbose)
+                        args.preserve_structure, args.verbose, args.rebuild_index, args.threads,
+                        args.tone_sequence, args.frames, args.format,
+                        args.store, args.store_chunk, args.store_codec, args.writers, args.queue_depth,
+                        args.memory_cap, args.scale)
     else:
         print(f"Error: {input_path} is not a valid file or directory")
         sys.exit(1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+BiRefNet .8ij Alpha Masks - Go straight from .8ij captures to black/white alpha masks
+Decodes .8ij frames in memory and feeds them to BiRefNet, writing only the masks
+
+Replaces the two-step workflow (8ij_to_png_pipeline.py → *_converted PNGs →
+birefnet_direct_alpha.py) without writing or re-reading any intermediate PNGs.
+Masks are named like the PNG pipeline's frames ({stem}_frame_{index:06d}.png),
+so downstream tools see the same file names as before.
+
+Model paths and the alpha threshold come from birefnet_direct_alpha.py.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from PIL import Image
+from tqdm import tqdm
+
+from birefnet_direct_alpha import BiRefNetDirectAlphaProcessor, INPUT_SIZE
+
+from eij_pipeline import pipeline
+
+def decode_scale_arg(value):
+    """argparse type for --decode-scale: 'auto' or 1, 2, 4, 8."""
+    return value if value == 'auto' else pipeline.decode_scale_arg(value)
+
+def get_frame_size(input_path):
+    """(width, height) of a .8ij file's frames, read from the first JPEG header"""
+    with pipeline.EijFile(input_path) as eij:
+        if not eij.frames:
+            return None
+        jpeg_data = eij.read_entry(eij.frames[0])
+        try:
+            info = pipeline.jpeg_frame_info(jpeg_data)
+        finally:
+            jpeg_data.release()
+    return (info[2], info[1]) if info else None
+
+def process_8ij_to_alpha(processor, input_path, output_dir, scaling_method='linear', threads=2,
+                         tone_sequence=None, frames=None, decode_scale=1):
+    """
+    Create alpha masks for every (selected) frame of one .8ij file
+
+    decode_scale > 1 decodes frames at reduced resolution before they are
+    resized to INPUT_SIZE for the model; 'auto' picks the smallest decode that
+    is still at least INPUT_SIZE, or full resolution if the decoder can't do
+    DCT-scaled decodes (see pick_decode_scale). Masks are always written at
+    full frame size.
+    """
+    input_path = Path(input_path)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"\n--- Processing {input_path.name} → {output_dir} ---")
+
+    # The cached frame index gives the frame count for progress without decoding
+    frame_filter = pipeline.as_frame_filter(frames)
+    frame_count = sum(1 for entry in pipeline.load_frame_index(input_path)['frames']
+                      if frame_filter is None or entry.index in frame_filter)
+    print(f"Found {frame_count} frames")
+
+    frame_size = get_frame_size(input_path) if decode_scale != 1 else None
+    if frame_size is None:
+        decode_scale = 1
+    elif decode_scale == 'auto':
+        decode_scale = pipeline.pick_decode_scale(*frame_size, INPUT_SIZE)
+        if not pipeline.scaled_decode_supported():
+            print("Decoder has no DCT scaling, decoding at full resolution")
+    if decode_scale != 1:
+        print(f"Decoding at 1/{decode_scale} resolution, masks at {frame_size[0]}x{frame_size[1]}")
+
+    # Decode/scale on background threads so the next frames are ready when
+    # the model finishes the current one
+    decoded = pipeline.iter_frames(input_path, frames=frame_filter, scaling=scaling_method,
+                                   threads=threads, tone_sequence=tone_sequence, scale=decode_scale)
+
+    success_count = 0
+    for frame_index, img_8bit in tqdm(decoded, total=frame_count, desc="Creating alpha masks"):
+        try:
+            # Generate alpha mask directly from BiRefNet
+            alpha_mask = processor.process_image_to_alpha(Image.fromarray(img_8bit),
+                                                          frame_size if decode_scale != 1 else None)
+
+            # Save as black/white PNG
+            alpha_image = Image.fromarray(alpha_mask, mode='L')
+            output_file = output_dir / f"{input_path.stem}_frame_{frame_index:06d}.png"
+            alpha_image.save(output_file, 'PNG')
+
+            success_count += 1
+
+        except Exception as e:
+            print(f"Error processing frame {frame_index}: {e}")
+            continue
+
+    print(f"✓ {success_count}/{frame_count} alpha masks created in {output_dir}")
+    return success_count
+
+def main():
+    parser = argparse.ArgumentParser(description='Create alpha masks directly from .8ij files')
+    parser.add_argument('input', help='Input .8ij file or directory')
+    parser.add_argument('output', help='Output directory for alpha masks')
+    parser.add_argument('--scaling', type=pipeline.scaling_method_arg, default='linear',
+                       help='Brightness scaling method: linear, auto, percentile, gamma[:G] or log[:K]')
+    parser.add_argument('--tone-sequence', type=pipeline.tone_sequence_arg, default=None,
+                       help="For auto/percentile: 'global' or a rolling N-frame window (default: per frame)")
+    parser.add_argument('--frames', type=pipeline.frame_selection_arg, default=None,
+                       help='Frame indices to mask, e.g. 4000:4100, ::10 or 5,17,200:400')
+    parser.add_argument('--decode-scale', type=decode_scale_arg, default=1,
+                       help="Decode frames at 1/2, 1/4 or 1/8 resolution, or 'auto' for the smallest "
+                            "decode still at least the model input size where the decoder supports "
+                            "DCT scaling (default: 1)")
+    parser.add_argument('--threads', type=int, default=2,
+                       help='Threads decoding frames ahead of the model (default: 2)')
+    parser.add_argument('--preserve-structure', action='store_true',
+                       help='Preserve directory structure in output')
+
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    output_dir = Path(args.output)
+
+    if input_path.is_file():
+        eij_files = [input_path]
+    elif input_path.is_dir():
+        eij_files = sorted(input_path.glob('**/*.8ij'))
+    else:
+        print(f"Error: {input_path} is not a valid file or directory")
+        sys.exit(1)
+
+    if not eij_files:
+        print(f"No .8ij files found in {input_path}")
+        return
+
+    print("BiRefNet .8ij Alpha Masks Generator")
+    print("=" * 70)
+    print(f"Found {len(eij_files)} .8ij file(s)")
+    print(f"Using {args.scaling} brightness scaling")
+
+    try:
+        # Initialize BiRefNet processor (only once)
+        processor = BiRefNetDirectAlphaProcessor()
+    except Exception as e:
+        print(f"Failed to initialize BiRefNet: {e}")
+        sys.exit(1)
+
+    total_masks = 0
+    for eij_file in eij_files:
+        if args.preserve_structure and input_path.is_dir():
+            file_output_dir = output_dir / eij_file.relative_to(input_path).parent
+        else:
+            file_output_dir = output_dir
+
+        total_masks += process_8ij_to_alpha(processor, eij_file, file_output_dir, args.scaling,
+                                            args.threads, args.tone_sequence, args.frames, args.decode_scale)
+
+    print(f"\n{'='*60}")
+    print(f"✓ {total_masks} alpha masks created in {output_dir}")
+
+if __name__ == "__main__":
+    main()
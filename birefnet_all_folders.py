@@ -5,19 +5,16 @@ Apply proper BiRefNet to all *_converted folders
 
 import os
 import sys
-import numpy as np
+import argparse
 from PIL import Image
 import torch
-import torch.nn.functional as F
-from torchvision import transforms
-from tqdm import tqdm
 from pathlib import Path
 
-# Add BiRefNet to path
-sys.path.append('/home/kenya/research/repos/BiRefNet')
+from birefnet_engine import (BiRefNetEngine, run_folder, add_batch_arguments, prefetch_options,
+                             DEFAULT_BATCH_SIZE, DEFAULT_WRITERS)
 
-from models.birefnet import BiRefNet
-from utils import check_state_dict
+# Add BiRefNet to path (models are loaded by birefnet_engine.py)
+sys.path.append('/home/kenya/research/repos/BiRefNet')
 
 # Configuration
 BASE_DIR = "/home/kenya/research/repos/seanalexv2_samples"
@@ -25,66 +22,9 @@ MODEL_PATH = "/home/kenya/research/repos/BiRefNet/checkpoints/BiRefNet-general.p
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 INPUT_SIZE = (1024, 1024)
 
-class BiRefNetProcessor:
+class BiRefNetProcessor(BiRefNetEngine):
     def __init__(self):
-        print(f"Loading BiRefNet model on {DEVICE}...")
-
-        # Initialize model
-        self.model = BiRefNet(bb_pretrained=False)
-
-        # Load weights
-        if os.path.exists(MODEL_PATH):
-            state_dict = torch.load(MODEL_PATH, map_location=DEVICE)
-            if 'module.' in list(state_dict.keys())[0]:
-                state_dict = check_state_dict(state_dict, unwanted_prefix='module.')
-            self.model.load_state_dict(state_dict)
-        else:
-            raise FileNotFoundError(f"Model weights not found at {MODEL_PATH}")
-
-        self.model.to(DEVICE)
-        self.model.eval()
-
-        # Standard ImageNet normalization
-        self.normalize = transforms.Normalize(
-            mean=[0.485, 0.456, 0.406],
-            std=[0.229, 0.224, 0.225]
-        )
-
-    def preprocess_image(self, image):
-        """Preprocess image for BiRefNet"""
-        original_size = image.size
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        image = image.resize(INPUT_SIZE, Image.Resampling.LANCZOS)
-        image_tensor = transforms.ToTensor()(image)
-        image_tensor = self.normalize(image_tensor)
-        return image_tensor, original_size
-
-    def postprocess_mask(self, mask, original_size):
-        """Postprocess model output to alpha mask"""
-        mask = torch.sigmoid(mask)
-        mask = F.interpolate(
-            mask.unsqueeze(0),
-            size=(original_size[1], original_size[0]),
-            mode='bilinear',
-            align_corners=False
-        ).squeeze(0)
-        mask = mask.cpu().numpy().squeeze()
-        mask = (mask * 255).astype(np.uint8)
-        return mask
-
-    @torch.no_grad()
-    def process_image(self, image):
-        """Process single image with BiRefNet"""
-        tensor, orig_size = self.preprocess_image(image)
-        batch = tensor.unsqueeze(0).to(DEVICE)
-        outputs = self.model(batch)
-        if isinstance(outputs, list):
-            mask = outputs[-1]
-        else:
-            mask = outputs
-        processed_mask = self.postprocess_mask(mask[0], orig_size)
-        return processed_mask
+        super().__init__(MODEL_PATH, DEVICE, INPUT_SIZE)
 
 def apply_mask_to_image(image, mask):
     """Apply mask to image to create transparent background"""
@@ -94,7 +34,13 @@ def apply_mask_to_image(image, mask):
     image.putalpha(alpha)
     return image
 
-def process_folder(processor, input_folder, output_folder):
+def save_masked_image(image, mask, output_file):
+    """Save an image with its mask applied as a transparent PNG"""
+    result = apply_mask_to_image(image, mask)
+    result.save(output_file, 'PNG')
+
+def process_folder(processor, input_folder, output_folder, batch_size=DEFAULT_BATCH_SIZE,
+                   prefetch=None, writers=DEFAULT_WRITERS):
     """Process all PNG files in a folder"""
     print(f"\n--- Processing {Path(input_folder).name} -> {Path(output_folder).name} ---")
 
@@ -110,29 +56,22 @@ def process_folder(processor, input_folder, output_folder):
 
     print(f"Found {len(png_files)} PNG files")
 
-    for filename in tqdm(png_files, desc="BiRefNet masking"):
-        try:
-            # Load image
-            img_path = os.path.join(input_folder, filename)
-            image = Image.open(img_path)
-
-            # Generate mask with BiRefNet
-            mask = processor.process_image(image)
+    def save(img_path, image, mask):
+        # Create and save the transparent PNG
+        save_masked_image(image, mask, os.path.join(output_folder, img_path.name))
 
-            # Create transparent PNG
-            result = apply_mask_to_image(image, mask)
+    image_paths = [Path(input_folder) / filename for filename in png_files]
+    written = run_folder(processor, image_paths, save, True, batch_size, prefetch, writers,
+                         desc="BiRefNet masking")
 
-            # Save result
-            output_file = os.path.join(output_folder, filename)
-            result.save(output_file, 'PNG')
-
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
-            continue
-
-    print(f"✓ Completed {Path(input_folder).name}")
+    print(f"✓ Completed {Path(input_folder).name}: {written}/{len(png_files)} images")
 
 def main():
+    parser = argparse.ArgumentParser(description='Apply BiRefNet to all *_converted folders')
+    add_batch_arguments(parser)
+    args = parser.parse_args()
+    prefetch = prefetch_options(args)
+
     print("BiRefNet Processing - All *_converted Folders")
     print("=" * 50)
 
@@ -152,7 +91,6 @@ def main():
     try:
         # Initialize BiRefNet processor (only once)
         processor = BiRefNetProcessor()
-        print("✓ BiRefNet model loaded successfully!")
 
         # Process each folder
         for converted_folder in converted_folders:
@@ -160,7 +98,8 @@ def main():
             mask_folder_name = folder_name.replace('_converted', '_mask')
             mask_folder = base_path / mask_folder_name
 
-            process_folder(processor, str(converted_folder), str(mask_folder))
+            process_folder(processor, str(converted_folder), str(mask_folder),
+                           args.batch_size, prefetch, args.writers)
 
         print(f"\n{'='*50}")
         print("✓ All folders processed with BiRefNet!")
@@ -6,19 +6,17 @@ Processes *_converted folders → creates both *_mask AND *_alpha_mask folders
 
 import os
 import sys
+import argparse
 import numpy as np
 from PIL import Image
 import torch
-import torch.nn.functional as F
-from torchvision import transforms
-from tqdm import tqdm
 from pathlib import Path
 
-# Add BiRefNet to path
-sys.path.append('/home/kenya/research/repos/BiRefNet')
+from birefnet_engine import (BiRefNetEngine, run_folder, add_batch_arguments, prefetch_options,
+                             format_prefetch, DEFAULT_BATCH_SIZE, DEFAULT_WRITERS)
 
-from models.birefnet import BiRefNet
-from utils import check_state_dict
+# Add BiRefNet to path (models are loaded by birefnet_engine.py)
+sys.path.append('/home/kenya/research/repos/BiRefNet')
 
 # ============================================================================
 # CONFIGURATION - CHANGE THESE VALUES FOR YOUR PROJECT
@@ -41,68 +39,9 @@ ALPHA_THRESHOLD = 128                # 0-255, controls mask sensitivity
 # BIREFNET PROCESSOR
 # ============================================================================
 
-class BiRefNetCombinedProcessor:
+class BiRefNetCombinedProcessor(BiRefNetEngine):
     def __init__(self):
-        print(f"Loading BiRefNet model on {DEVICE}...")
-
-        # Initialize model
-        self.model = BiRefNet(bb_pretrained=False)
-
-        # Load weights
-        if os.path.exists(MODEL_PATH):
-            state_dict = torch.load(MODEL_PATH, map_location=DEVICE)
-            if 'module.' in list(state_dict.keys())[0]:
-                state_dict = check_state_dict(state_dict, unwanted_prefix='module.')
-            self.model.load_state_dict(state_dict)
-        else:
-            raise FileNotFoundError(f"Model weights not found at {MODEL_PATH}")
-
-        self.model.to(DEVICE)
-        self.model.eval()
-
-        # Standard ImageNet normalization
-        self.normalize = transforms.Normalize(
-            mean=[0.485, 0.456, 0.406],
-            std=[0.229, 0.224, 0.225]
-        )
-
-        print(f"✓ BiRefNet model loaded successfully on {DEVICE}")
-
-    def preprocess_image(self, image):
-        """Preprocess image for BiRefNet"""
-        original_size = image.size
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        image = image.resize(INPUT_SIZE, Image.Resampling.LANCZOS)
-        image_tensor = transforms.ToTensor()(image)
-        image_tensor = self.normalize(image_tensor)
-        return image_tensor, original_size
-
-    def postprocess_mask(self, mask, original_size):
-        """Postprocess model output to alpha mask"""
-        mask = torch.sigmoid(mask)
-        mask = F.interpolate(
-            mask.unsqueeze(0),
-            size=(original_size[1], original_size[0]),
-            mode='bilinear',
-            align_corners=False
-        ).squeeze(0)
-        mask = mask.cpu().numpy().squeeze()
-        mask = (mask * 255).astype(np.uint8)
-        return mask
-
-    @torch.no_grad()
-    def process_image(self, image):
-        """Process single image with BiRefNet"""
-        tensor, orig_size = self.preprocess_image(image)
-        batch = tensor.unsqueeze(0).to(DEVICE)
-        outputs = self.model(batch)
-        if isinstance(outputs, list):
-            mask = outputs[-1]
-        else:
-            mask = outputs
-        processed_mask = self.postprocess_mask(mask[0], orig_size)
-        return processed_mask
+        super().__init__(MODEL_PATH, DEVICE, INPUT_SIZE)
 
 # ============================================================================
 # OUTPUT CREATION FUNCTIONS
@@ -121,7 +60,18 @@ def create_alpha_mask(mask, threshold=ALPHA_THRESHOLD):
     alpha_mask = (mask > threshold).astype(np.uint8) * 255
     return Image.fromarray(alpha_mask, mode='L')
 
-def process_folder(processor, input_folder, rgba_output_folder, alpha_output_folder):
+def save_both_masks(image, mask, rgba_output_file, alpha_output_file):
+    """Save the RGBA mask and the black/white alpha mask of one image"""
+    # Create RGBA mask (transparent background)
+    rgba_result = create_rgba_mask(image, mask)
+    rgba_result.save(rgba_output_file, 'PNG')
+
+    # Create alpha mask (black/white)
+    alpha_result = create_alpha_mask(mask)
+    alpha_result.save(alpha_output_file, 'PNG')
+
+def process_folder(processor, input_folder, rgba_output_folder, alpha_output_folder, batch_size=DEFAULT_BATCH_SIZE,
+                   prefetch=None, writers=DEFAULT_WRITERS):
     """Process all PNG files in a folder - create both RGBA and alpha masks"""
     print(f"\n--- Processing {Path(input_folder).name} ---")
     print(f"  → RGBA masks: {Path(rgba_output_folder).name}")
@@ -140,30 +90,16 @@ def process_folder(processor, input_folder, rgba_output_folder, alpha_output_fol
 
     print(f"Found {len(png_files)} PNG files")
 
-    for filename in tqdm(png_files, desc="Creating both mask types"):
-        try:
-            # Load image
-            img_path = os.path.join(input_folder, filename)
-            image = Image.open(img_path)
+    def save(img_path, image, mask):
+        # Encode and save both masks
+        save_both_masks(image, mask, os.path.join(rgba_output_folder, img_path.name),
+                        os.path.join(alpha_output_folder, img_path.name))
 
-            # Generate mask with BiRefNet
-            mask = processor.process_image(image)
+    image_paths = [Path(input_folder) / filename for filename in png_files]
+    written = run_folder(processor, image_paths, save, True, batch_size, prefetch, writers,
+                         desc="Creating both mask types")
 
-            # Create RGBA mask (transparent background)
-            rgba_result = create_rgba_mask(image, mask)
-            rgba_output_file = os.path.join(rgba_output_folder, filename)
-            rgba_result.save(rgba_output_file, 'PNG')
-
-            # Create alpha mask (black/white)
-            alpha_result = create_alpha_mask(mask)
-            alpha_output_file = os.path.join(alpha_output_folder, filename)
-            alpha_result.save(alpha_output_file, 'PNG')
-
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
-            continue
-
-    print(f"✓ Completed {Path(input_folder).name}")
+    print(f"✓ Completed {Path(input_folder).name}: {written}/{len(png_files)} images")
 
 def find_input_folders(base_directory, suffix):
     """Find all folders ending with specified suffix"""
@@ -184,6 +120,11 @@ def find_input_folders(base_directory, suffix):
 
 def main():
     """Main processing function"""
+    parser = argparse.ArgumentParser(description='Create RGBA and alpha masks with BiRefNet in one run')
+    add_batch_arguments(parser)
+    args = parser.parse_args()
+    prefetch = prefetch_options(args)
+
     print("BiRefNet Combined Output - RGBA + Alpha Masks")
     print("=" * 60)
     print(f"Configuration:")
@@ -193,6 +134,10 @@ def main():
     print(f"  Alpha Output: '{ALPHA_OUTPUT_SUFFIX}'")
     print(f"  Alpha Threshold: {ALPHA_THRESHOLD}")
     print(f"  Device: {DEVICE}")
+    print(f"  Batch Size: {args.batch_size}")
+    print(f"  Prefetch: {format_prefetch(prefetch)}")
+    print(f"  Preprocessing: {args.preprocessing}")
+    print(f"  Mask Writers: {args.writers}")
     print("=" * 60)
 
     # Find all input folders
@@ -221,7 +166,8 @@ def main():
             rgba_folder = Path(BASE_DIR) / rgba_folder_name
             alpha_folder = Path(BASE_DIR) / alpha_folder_name
 
-            process_folder(processor, str(input_folder), str(rgba_folder), str(alpha_folder))
+            process_folder(processor, str(input_folder), str(rgba_folder), str(alpha_folder),
+                           args.batch_size, prefetch, args.writers)
 
         print(f"\n{'='*60}")
         print("✓ All folders processed with combined output!")
@@ -11,14 +11,18 @@ Alpha masks are black/white images where:
 
 import os
 import sys
-import numpy as np
+import hashlib
+import argparse
+import importlib
 from PIL import Image
 import torch
-import torch.nn.functional as F
-from torchvision import transforms
-from tqdm import tqdm
 from pathlib import Path
 
+from birefnet_engine import (BiRefNetEngine, run_folder, add_batch_arguments, prefetch_options,
+                             format_prefetch, threshold_upsample, DEFAULT_BATCH_SIZE, DEFAULT_WRITERS)
+import sharding
+import lease_queue
+
 # ============================================================================
 # USER CONFIGURATION - EDIT THESE VALUES FOR YOUR PROJECT
 # ============================================================================
@@ -39,6 +43,9 @@ ALPHA_THRESHOLD = 128               # 0-255, controls mask sensitivity
                                    # 128 = balanced (recommended)
                                    # 200 = stricter (cleaner masks, may lose details)
 
+# Lease mode (--work-dir): images claimed per lease
+DEFAULT_CLAIM_SIZE = 256
+
 # Hardware settings
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -54,9 +61,11 @@ else:
     print("Please ensure BiRefNet is cloned to the correct location")
     sys.exit(1)
 
+# Check the BiRefNet modules import before any work starts; BiRefNetEngine
+# imports what it needs itself when the model is loaded
 try:
-    from models.birefnet import BiRefNet
-    from utils import check_state_dict
+    importlib.import_module('models.birefnet')
+    importlib.import_module('utils')
 except ImportError as e:
     print(f"ERROR: Failed to import BiRefNet modules: {e}")
     print("Please ensure BiRefNet is properly installed and BIREFNET_PATH is correct")
@@ -66,122 +75,168 @@ except ImportError as e:
 # BIREFNET DIRECT ALPHA PROCESSOR
 # ============================================================================
 
-class BiRefNetDirectAlphaProcessor:
+class BiRefNetDirectAlphaProcessor(BiRefNetEngine):
     def __init__(self):
-        print(f"Loading BiRefNet model on {DEVICE}...")
-
-        # Initialize model
-        self.model = BiRefNet(bb_pretrained=False)
-
-        # Load weights
-        if os.path.exists(MODEL_PATH):
-            state_dict = torch.load(MODEL_PATH, map_location=DEVICE)
-            if 'module.' in list(state_dict.keys())[0]:
-                state_dict = check_state_dict(state_dict, unwanted_prefix='module.')
-            self.model.load_state_dict(state_dict)
-        else:
-            raise FileNotFoundError(f"Model weights not found at {MODEL_PATH}")
-
-        self.model.to(DEVICE)
-        self.model.eval()
-
-        # Standard ImageNet normalization
-        self.normalize = transforms.Normalize(
-            mean=[0.485, 0.456, 0.406],
-            std=[0.229, 0.224, 0.225]
-        )
-
-        print(f"✓ BiRefNet model loaded successfully on {DEVICE}")
-
-    def preprocess_image(self, image):
-        """Preprocess image for BiRefNet"""
-        original_size = image.size
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        image = image.resize(INPUT_SIZE, Image.Resampling.LANCZOS)
-        image_tensor = transforms.ToTensor()(image)
-        image_tensor = self.normalize(image_tensor)
-        return image_tensor, original_size
+        super().__init__(MODEL_PATH, DEVICE, INPUT_SIZE)
 
     def postprocess_to_alpha_mask(self, mask, original_size, threshold=ALPHA_THRESHOLD):
-        """Postprocess model output directly to black/white alpha mask"""
-        # Apply sigmoid to get probabilities
-        mask = torch.sigmoid(mask)
-
-        # Resize to original size
-        mask = F.interpolate(
-            mask.unsqueeze(0),
-            size=(original_size[1], original_size[0]),
-            mode='bilinear',
-            align_corners=False
-        ).squeeze(0)
-
-        # Convert to numpy
-        mask = mask.cpu().numpy().squeeze()
-
-        # Convert directly to black/white alpha mask
-        # Values above threshold = white (255), below = black (0)
-        alpha_mask = (mask > (threshold / 255.0)).astype(np.uint8) * 255
-
-        return alpha_mask
-
-    @torch.no_grad()
-    def process_image_to_alpha(self, image):
-        """Process single image directly to alpha mask"""
-        tensor, orig_size = self.preprocess_image(image)
-        batch = tensor.unsqueeze(0).to(DEVICE)
-
-        # Run BiRefNet inference
-        outputs = self.model(batch)
-        if isinstance(outputs, list):
-            mask = outputs[-1]
-        else:
-            mask = outputs
-
-        # Convert directly to alpha mask
-        alpha_mask = self.postprocess_to_alpha_mask(mask[0], orig_size)
-        return alpha_mask
-
-def process_folder(processor, input_folder, output_folder):
-    """Process all PNG files in a folder - create alpha masks directly"""
+        """
+        Postprocess model output directly to black/white alpha mask
+
+        Values above threshold = white (255), below = black (0). The threshold
+        is compared in logit space at model resolution, and only the boundary
+        band is interpolated to the original size (see threshold_upsample),
+        with the same result as thresholding the full-size interpolated mask.
+        """
+        return threshold_upsample(mask, original_size, threshold / 255.0)
+
+    def postprocess_mask(self, mask, original_size):
+        return self.postprocess_to_alpha_mask(mask, original_size)
+
+    def process_image_to_alpha(self, image, output_size=None):
+        """
+        Process single image directly to alpha mask
+
+        output_size (width, height) defaults to the image size; pass the full
+        frame size when the image was decoded at reduced resolution.
+        """
+        return self.process_image(image, output_size)
+
+def list_image_files(input_folder):
+    """Supported image files in a folder, sorted by name"""
+    image_files = []
+    for ext in ['.png', '.jpg', '.jpeg']:
+        image_files.extend(Path(input_folder).glob(f"*{ext}"))
+        image_files.extend(Path(input_folder).glob(f"*{ext.upper()}"))
+    return sorted(set(image_files))
+
+def save_alpha_mask(alpha_mask, output_file):
+    """Save a black/white alpha mask as PNG"""
+    Image.fromarray(alpha_mask, mode='L').save(output_file, 'PNG')
+
+def process_images(processor, image_files, output_folder, batch_size=DEFAULT_BATCH_SIZE, prefetch=None,
+                   writers=DEFAULT_WRITERS):
+    """
+    Create an alpha mask in output_folder for each image; returns the number created
+
+    Loading, inference and saving overlap as described in run_folder.
+    """
+    def save(img_path, _, alpha_mask):
+        # Save as black/white PNG
+        save_alpha_mask(alpha_mask, Path(output_folder) / f"{img_path.stem}.png")
+
+    return run_folder(processor, image_files, save, False, batch_size, prefetch, writers,
+                      desc="Creating alpha masks")
+
+def process_folder(processor, input_folder, output_folder, shard=None, batch_size=DEFAULT_BATCH_SIZE,
+                   prefetch=None, writers=DEFAULT_WRITERS):
+    """
+    Process all PNG files in a folder - create alpha masks directly
+
+    With shard=(i, N) only this node's share of the images is processed,
+    split by their path relative to the base directory (see sharding.py).
+    """
     print(f"\n--- Processing {Path(input_folder).name} → {Path(output_folder).name} ---")
 
     # Create output directory
     os.makedirs(output_folder, exist_ok=True)
 
     # Get supported image files
-    image_files = []
-    for ext in ['.png', '.jpg', '.jpeg']:
-        image_files.extend(Path(input_folder).glob(f"*{ext}"))
-        image_files.extend(Path(input_folder).glob(f"*{ext.upper()}"))
+    image_files = list_image_files(input_folder)
 
     if not image_files:
         print(f"No image files found in {input_folder}")
         return
 
-    print(f"Found {len(image_files)} image files")
-
-    success_count = 0
-    for img_path in tqdm(image_files, desc="Creating alpha masks"):
-        try:
-            # Load image
-            image = Image.open(img_path)
+    if shard is not None:
+        found = len(image_files)
+        image_files = sharding.select_shard(image_files, shard, Path(input_folder).parent)
+        print(f"Shard {sharding.format_shard(shard)}: {len(image_files)} of {found} image files")
+    else:
+        print(f"Found {len(image_files)} image files")
 
-            # Generate alpha mask directly from BiRefNet
-            alpha_mask = processor.process_image_to_alpha(image)
+    success_count = process_images(processor, image_files, output_folder, batch_size, prefetch, writers)
 
-            # Save as black/white PNG
-            alpha_image = Image.fromarray(alpha_mask, mode='L')
-            output_file = Path(output_folder) / f"{img_path.stem}.png"
-            alpha_image.save(output_file, 'PNG')
-
-            success_count += 1
+    print(f"✓ {success_count}/{len(image_files)} alpha masks created in {Path(output_folder).name}")
 
-        except Exception as e:
-            print(f"Error processing {img_path.name}: {e}")
-            continue
+def batch_key(folder_name, image_files):
+    """
+    Lease key for a batch of images: folder, first image and a hash of every
+    image name, so workers only share a key when they'd process the same images
+    """
+    digest = hashlib.sha1('\n'.join(path.name for path in image_files).encode('utf-8')).hexdigest()[:12]
+    return f"{folder_name}/{image_files[0].name}#{digest}"
+
+def process_folders_leased(processor, input_folders, work_dir, claim_size=DEFAULT_CLAIM_SIZE,
+                           lease_seconds=lease_queue.DEFAULT_LEASE_SECONDS, shard=None,
+                           batch_size=DEFAULT_BATCH_SIZE, prefetch=None, writers=DEFAULT_WRITERS,
+                           retry_failed=False):
+    """
+    Create alpha masks by claiming batches of claim_size images from a shared
+    lease work directory (see lease_queue.py), so any number of workers on
+    any number of nodes can drain the same folders. Batches of a crashed
+    worker are picked up again once its lease expires.
+
+    Batches are keyed by the images they hold (see batch_key), so workers
+    with different shards can share a work directory, and images added to a
+    folder later only redo the batches they change. One work_dir belongs to
+    one set of mask settings. Failed batches stay failed unless retry_failed
+    clears them first.
+    """
+    settings = {
+        'base_dir': str(Path(BASE_DIR).resolve()),
+        'model': MODEL_PATH,
+        'input_size': list(INPUT_SIZE),
+        'threshold': ALPHA_THRESHOLD,
+        'claim_size': claim_size,
+    }
+    if not lease_queue.check_work_settings(work_dir, settings):
+        print(f"ERROR: {work_dir} was created for different settings; use a new work directory")
+        return
 
-    print(f"✓ {success_count}/{len(image_files)} alpha masks created in {Path(output_folder).name}")
+    jobs = {}
+    for input_folder in sorted(input_folders):
+        output_folder = Path(BASE_DIR) / input_folder.name.replace(INPUT_SUFFIX, OUTPUT_SUFFIX)
+        image_files = list_image_files(input_folder)
+        if shard is not None:
+            image_files = sharding.select_shard(image_files, shard, input_folder.parent)
+        for batch in range(0, len(image_files), claim_size):
+            chunk = image_files[batch:batch + claim_size]
+            jobs[batch_key(input_folder.name, chunk)] = (chunk, output_folder)
+
+    queue = lease_queue.LeaseQueue(work_dir, lease_seconds=lease_seconds)
+    print(f"Claiming {len(jobs)} batches of up to {claim_size} images from {work_dir} as {queue.worker_id}")
+    if retry_failed:
+        print(f"Retrying {queue.retry_failed(jobs)} failed batches")
+
+    batches = 0
+    masks = 0
+    try:
+        for lease in queue.drain(jobs):
+            image_files, output_folder = jobs[lease.key]
+            print(f"\n--- Batch {lease.key} ({len(image_files)} images) → {output_folder.name} ---")
+            try:
+                os.makedirs(output_folder, exist_ok=True)
+                success_count = process_images(processor, image_files, output_folder, batch_size,
+                                               prefetch, writers)
+            except Exception as e:
+                lease.fail(str(e))
+                print(f"Error processing batch {lease.key}: {e}")
+                continue
+            masks += success_count
+            if success_count != len(image_files):
+                # Keep the batch retryable (--retry-failed) rather than recording missing masks as done
+                lease.fail(f"{len(image_files) - success_count} images failed")
+                print(f"Error processing batch {lease.key}: {len(image_files) - success_count} images failed")
+                continue
+            lease.complete({'masks': success_count, 'images': len(image_files)})
+            batches += 1
+    finally:
+        queue.close()
+
+    status = queue.status(jobs)
+    print(f"\n✓ This worker: {masks} alpha masks in {batches} batches | "
+          f"All workers: {status['done']}/{len(jobs)} batches done, {status['failed']} failed")
 
 def find_input_folders(base_directory, suffix):
     """Find all folders ending with specified suffix"""
@@ -202,6 +257,23 @@ def find_input_folders(base_directory, suffix):
 
 def main():
     """Main processing function"""
+    parser = argparse.ArgumentParser(description='Create alpha masks with BiRefNet for every '
+                                                 f'*{INPUT_SUFFIX} folder in BASE_DIR')
+    add_batch_arguments(parser)
+    sharding.add_shard_argument(parser)
+    parser.add_argument('--work-dir', default=None,
+                       help='Shared directory to claim image batches from with leases, so any number of '
+                            'workers/nodes can drain the same folders (default: off)')
+    parser.add_argument('--claim-size', type=int, default=DEFAULT_CLAIM_SIZE,
+                       help=f'Images per claimed batch in --work-dir mode (default: {DEFAULT_CLAIM_SIZE})')
+    parser.add_argument('--lease-seconds', type=float, default=lease_queue.DEFAULT_LEASE_SECONDS,
+                       help=f'Lease lifetime without a heartbeat before a batch is reclaimed '
+                            f'(default: {lease_queue.DEFAULT_LEASE_SECONDS})')
+    parser.add_argument('--retry-failed', action='store_true',
+                       help='With --work-dir: clear failed batches so they are claimed again')
+    args = parser.parse_args()
+    prefetch = prefetch_options(args)
+
     print("BiRefNet Direct Alpha Masks Generator")
     print("Converts photos directly to black/white alpha masks using AI")
     print("=" * 70)
@@ -230,6 +302,14 @@ def main():
     print(f"  Output Suffix: '{OUTPUT_SUFFIX}' (will create folders like 'Cam0{OUTPUT_SUFFIX}')")
     print(f"  Alpha Threshold: {ALPHA_THRESHOLD} (lower=more inclusive, higher=stricter)")
     print(f"  Device: {DEVICE}")
+    print(f"  Batch Size: {args.batch_size}")
+    print(f"  Prefetch: {format_prefetch(prefetch)}")
+    print(f"  Preprocessing: {args.preprocessing}")
+    print(f"  Mask Writers: {args.writers}")
+    if args.shard is not None:
+        print(f"  Shard: {sharding.format_shard(args.shard)}")
+    if args.work_dir:
+        print(f"  Work Directory: {args.work_dir} (batches of {args.claim_size} images)")
     print("=" * 70)
 
     # Find all input folders
@@ -258,15 +338,22 @@ def main():
         # Initialize BiRefNet processor (only once)
         processor = BiRefNetDirectAlphaProcessor()
 
-        # Process each folder
-        for input_folder in sorted(input_folders):
-            folder_name = input_folder.name
+        if args.work_dir:
+            # Claim image batches from the shared work directory
+            process_folders_leased(processor, input_folders, args.work_dir, args.claim_size,
+                                   args.lease_seconds, args.shard, args.batch_size,
+                                   prefetch, args.writers, args.retry_failed)
+        else:
+            # Process each folder
+            for input_folder in sorted(input_folders):
+                folder_name = input_folder.name
 
-            # Create output folder name
-            output_folder_name = folder_name.replace(INPUT_SUFFIX, OUTPUT_SUFFIX)
-            output_folder = Path(BASE_DIR) / output_folder_name
+                # Create output folder name
+                output_folder_name = folder_name.replace(INPUT_SUFFIX, OUTPUT_SUFFIX)
+                output_folder = Path(BASE_DIR) / output_folder_name
 
-            process_folder(processor, str(input_folder), str(output_folder))
+                process_folder(processor, str(input_folder), str(output_folder), args.shard, args.batch_size,
+                               prefetch, args.writers)
 
         print(f"\n{'='*60}")
         print("✓ All folders processed to alpha masks!")
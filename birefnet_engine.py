@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+BiRefNet Engine - model loading, preprocessing and batched inference shared by
+birefnet_direct_alpha.py, birefnet_combined_output.py and birefnet_all_folders.py
+
+Each script keeps its own configuration (model path, device, BiRefNet checkout)
+and subclasses BiRefNetEngine, overriding postprocess_mask() for the kind of
+mask it writes. process_batch() stacks a batch of preprocessed images and runs
+a single forward pass, which amortizes per-call overhead, especially on CPU.
+
+prefetch_batches() loads and preprocesses the next batches of image files on
+worker threads (or processes) while the model runs on the current one, and
+MaskWriter encodes and saves finished masks on writer threads, so PNG
+compression and filesystem latency overlap with the next forward pass.
+run_folder() ties the two together around process_tensors() for a list of
+image files.
+
+Two preprocessing paths are available:
+- 'pil' (default): PIL LANCZOS resize, ToTensor and Normalize per image
+- 'tensor': antialiased bicubic resize of the uint8 pixels with torch, and
+  the /255 scaling plus ImageNet normalization fused into one affine op over
+  the whole batch, written into a batch buffer reused across forward passes
+  (test_runner.py --parity checks it against the PIL path)
+
+threshold_upsample() turns model logits into a full-resolution black/white
+mask without a full-resolution float interpolation (see its docstring).
+"""
+
+import os
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+import torch
+import torch.nn.functional as F
+from torchvision import transforms
+from tqdm import tqdm
+
+# Standard ImageNet normalization
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+DEFAULT_BATCH_SIZE = 1
+DEFAULT_PREFETCH_WORKERS = 2
+DEFAULT_PREFETCH_DEPTH = 2      # Batches prepared ahead of the model
+DEFAULT_WRITERS = 2
+PREPROCESSING = ['pil', 'tensor']
+DEFAULT_PREPROCESSING = 'pil'
+
+# ToTensor's /255 and Normalize folded into one affine op: x * NORM_SCALE + NORM_BIAS
+NORM_SCALE = torch.tensor([1 / (255 * std) for std in IMAGENET_STD]).view(3, 1, 1)
+NORM_BIAS = torch.tensor([-mean / std for mean, std in zip(IMAGENET_MEAN, IMAGENET_STD)]).view(3, 1, 1)
+
+def add_batch_arguments(parser):
+    """Add --batch-size, the --prefetch-* options and --writers to an argparse parser"""
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f'Images per BiRefNet forward pass (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--prefetch-workers', type=int, default=DEFAULT_PREFETCH_WORKERS,
+                       help=f'Workers loading and preprocessing images ahead of the model; 0 loads them '
+                            f'inline (default: {DEFAULT_PREFETCH_WORKERS})')
+    parser.add_argument('--prefetch-depth', type=int, default=DEFAULT_PREFETCH_DEPTH,
+                       help=f'Batches prepared ahead of the model (default: {DEFAULT_PREFETCH_DEPTH})')
+    parser.add_argument('--prefetch-processes', action='store_true',
+                       help='Prefetch with worker processes instead of threads')
+    parser.add_argument('--preprocessing', choices=PREPROCESSING, default=DEFAULT_PREPROCESSING,
+                       help="'pil' (LANCZOS + ToTensor + Normalize) or 'tensor' (torch uint8 resize with "
+                            f"fused normalization, much faster on CPU) (default: {DEFAULT_PREPROCESSING})")
+    parser.add_argument('--writers', type=int, default=DEFAULT_WRITERS,
+                       help=f'Threads encoding and saving masks while the model runs; 0 saves them '
+                            f'inline (default: {DEFAULT_WRITERS})')
+
+def prefetch_options(args):
+    """prefetch_batches keyword arguments from parsed add_batch_arguments options"""
+    return {'workers': args.prefetch_workers, 'depth': args.prefetch_depth, 'processes': args.prefetch_processes,
+            'preprocessing': args.preprocessing}
+
+def format_prefetch(options):
+    """Human-readable prefetch settings, e.g. '2 threads, 2 batches ahead'"""
+    if options['workers'] <= 0:
+        return 'off'
+    kind = 'processes' if options['processes'] else 'threads'
+    return f"{options['workers']} {kind}, {options['depth']} batches ahead"
+
+def batched(items, batch_size):
+    """Split a list into consecutive lists of at most batch_size items"""
+    batch_size = max(int(batch_size), 1)
+    return [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+
+def preprocess_image(image, input_size):
+    """Resize and normalize a PIL image for BiRefNet; returns (tensor, original_size)"""
+    original_size = image.size
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image = image.resize(input_size, Image.Resampling.LANCZOS)
+    image_tensor = transforms.ToTensor()(image)
+    image_tensor = transforms.functional.normalize(image_tensor, IMAGENET_MEAN, IMAGENET_STD)
+    return image_tensor, original_size
+
+def resize_image_tensor(image, input_size):
+    """
+    Tensor-native preprocessing: resize a PIL image's uint8 pixels with
+    torch's antialiased bicubic interpolation (close to PIL's LANCZOS).
+    Returns a (3, H, W) uint8 tensor and the original size; normalization
+    happens per batch in normalize_batch().
+    """
+    original_size = image.size
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    # HWC pixels viewed as a channels-last NCHW tensor, the fast path for uint8 resizing
+    pixels = torch.from_numpy(np.array(image)).permute(2, 0, 1).unsqueeze(0)
+    pixels = F.interpolate(pixels, size=(input_size[1], input_size[0]), mode='bicubic',
+                           antialias=True, align_corners=False)
+    return pixels[0], original_size
+
+def normalize_batch(pixels, out=None):
+    """uint8 (B, 3, H, W) pixels → normalized float32 model input, in one affine op (into out if given)"""
+    return torch.addcmul(NORM_BIAS.to(pixels.device), pixels, NORM_SCALE.to(pixels.device), out=out)
+
+PREPROCESSORS = {'pil': preprocess_image, 'tensor': resize_image_tensor}
+
+# Source pixels whose logit is this close to the threshold logit are always
+# interpolated exactly, so float rounding in sigmoid can't flip a decision
+LOGIT_BAND_EPS = 1e-3
+# Above this fraction of boundary cells (very noisy masks) plain full-resolution
+# interpolation is faster than interpolating the band pixel by pixel
+MAX_BAND_FRACTION = 0.04
+
+def bilinear_taps(in_size, out_size):
+    """
+    Per output position along one axis: the two source indices and the
+    weight of the second, as computed by F.interpolate(mode='bilinear', align_corners=False)
+    """
+    src = (torch.arange(out_size, dtype=torch.float32) + 0.5) * (in_size / out_size) - 0.5
+    src.clamp_(min=0)
+    index0 = src.long()
+    index1 = (index0 + 1).clamp_(max=in_size - 1)
+    return index0.numpy(), index1.numpy(), (src - index0).numpy()
+
+def _threshold_interpolate(logits, size, probability):
+    """Reference path: full-resolution float interpolation of the probabilities, then threshold"""
+    prob = F.interpolate(torch.sigmoid(logits)[None, None], size=(size[1], size[0]), mode='bilinear',
+                         align_corners=False)[0, 0]
+    return (prob > probability).numpy().astype(np.uint8) * 255
+
+def threshold_upsample(logits, size, probability):
+    """
+    Black/white uint8 mask of sigmoid(logits), bilinearly upsampled to size
+    (width, height) and compared to probability - the same result as
+    interpolating the float probabilities at full resolution, without doing so.
+
+    Each bilinear output pixel is a convex combination of its 4 source taps,
+    so where all 4 are on the same side of the threshold (compared in logit
+    space, no sigmoid needed) the output is a copy of any of them. Only output
+    pixels of source cells in the boundary band are interpolated, at full
+    precision. logits is a (1, h, w) or (h, w) tensor at model resolution.
+    """
+    logits = logits.detach().reshape(logits.shape[-2:]).float().cpu()
+    height, width = logits.shape
+    if probability <= 0 or probability >= 1:
+        return np.full((size[1], size[0]), 255 if probability <= 0 else 0, dtype=np.uint8)
+
+    if size[0] * size[1] <= width * height:
+        # Not upscaling: the plain float interpolation is no bigger than the model output
+        return _threshold_interpolate(logits, size, probability)
+
+    threshold_logit = math.log(probability / (1 - probability))
+    values = logits.numpy()
+    above = values > threshold_logit
+    near = np.abs(values - threshold_logit) <= LOGIT_BAND_EPS
+
+    # A source cell is a pixel with its bottom/right neighbours - the taps of
+    # every output pixel whose first tap it is. Band cells have taps that
+    # disagree or are too close to the threshold to call.
+    any_above = above.copy()
+    all_above = above.copy()
+    for cells, combine in ((any_above, np.logical_or), (all_above, np.logical_and), (near, np.logical_or)):
+        combine(cells[:-1], cells[1:], out=cells[:-1])
+        combine(cells[:, :-1], cells[:, 1:], out=cells[:, :-1])
+    band = (any_above & ~all_above) | near
+    if np.count_nonzero(band) > MAX_BAND_FRACTION * band.size:
+        return _threshold_interpolate(logits, size, probability)
+
+    y0, y1, wy = bilinear_taps(height, size[1])
+    x0, x1, wx = bilinear_taps(width, size[0])
+
+    # Outside the band every output pixel equals its first tap
+    alpha = np.take(np.take(above.astype(np.uint8) * 255, x0, axis=1), y0, axis=0)
+
+    # Output pixels of each band cell: the block of rows/columns whose first tap it is
+    cell_rows, cell_cols = np.nonzero(band)
+    if len(cell_rows):
+        row_counts = np.bincount(y0, minlength=height)
+        col_counts = np.bincount(x0, minlength=width)
+        row_starts = np.cumsum(row_counts) - row_counts
+        col_starts = np.cumsum(col_counts) - col_counts
+
+        block_rows = row_counts[cell_rows]
+        block_cols = col_counts[cell_cols]
+        block_sizes = block_rows * block_cols
+        cell = np.repeat(np.arange(len(cell_rows)), block_sizes)
+        offset = np.arange(block_sizes.sum()) - np.repeat(np.cumsum(block_sizes) - block_sizes, block_sizes)
+        ys = row_starts[cell_rows][cell] + offset // block_cols[cell]
+        xs = col_starts[cell_cols][cell] + offset % block_cols[cell]
+
+        prob = torch.sigmoid(logits).numpy()
+        py0, py1, ly = y0[ys], y1[ys], wy[ys]
+        px0, px1, lx = x0[xs], x1[xs], wx[xs]
+        interpolated = ((1 - ly) * ((1 - lx) * prob[py0, px0] + lx * prob[py0, px1]) +
+                        ly * ((1 - lx) * prob[py1, px0] + lx * prob[py1, px1]))
+        alpha[ys, xs] = (interpolated > probability) * np.uint8(255)
+
+    return alpha
+
+def load_image(path, input_size, keep_image=False, preprocessing=DEFAULT_PREPROCESSING):
+    """
+    Open and preprocess one image file; returns (image, tensor, original_size).
+    image is the loaded PIL image with keep_image, else None.
+    """
+    image = Image.open(path)
+    image.load()
+    tensor, original_size = PREPROCESSORS[preprocessing](image, input_size)
+    return (image if keep_image else None), tensor, original_size
+
+def _init_prefetch_process():
+    # One torch thread per worker process; the processes themselves are the parallelism
+    torch.set_num_threads(1)
+
+def _load_or_error(path, input_size, keep_image, preprocessing):
+    try:
+        return load_image(path, input_size, keep_image, preprocessing), None
+    except Exception as e:
+        return None, e
+
+def prefetch_batches(paths, input_size, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_PREFETCH_WORKERS,
+                     depth=DEFAULT_PREFETCH_DEPTH, processes=False, keep_images=False,
+                     preprocessing=DEFAULT_PREPROCESSING):
+    """
+    Yield (loaded, failed) per batch of paths, in order: loaded is a list of
+    (path, image, tensor, original_size) and failed a list of (path, error).
+
+    With workers > 0 the files are opened and preprocessed on a pool of
+    worker threads (or processes), keeping up to depth batches ready ahead of
+    the consumer. workers=0 loads each batch inline when it is requested.
+    preprocessing picks the 'pil' or 'tensor' path (see module docstring).
+    """
+    batches = batched(list(paths), batch_size)
+
+    def collect(batch_paths, results):
+        loaded, failed = [], []
+        for path, (result, error) in zip(batch_paths, results):
+            if error is None:
+                loaded.append((path, *result))
+            else:
+                failed.append((path, error))
+        return loaded, failed
+
+    if workers <= 0:
+        for batch_paths in batches:
+            yield collect(batch_paths, [_load_or_error(path, input_size, keep_images, preprocessing)
+                                        for path in batch_paths])
+        return
+
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_prefetch_process)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for batch_paths in batches:
+            pending.append((batch_paths, [executor.submit(_load_or_error, path, input_size, keep_images,
+                                                          preprocessing)
+                                          for path in batch_paths]))
+            if len(pending) > depth:
+                batch_paths, futures = pending.popleft()
+                yield collect(batch_paths, [future.result() for future in futures])
+        while pending:
+            batch_paths, futures = pending.popleft()
+            yield collect(batch_paths, [future.result() for future in futures])
+    finally:
+        # Stop loading ahead if the consumer quits early
+        executor.shutdown(wait=True, cancel_futures=True)
+
+class MaskWriter:
+    """
+    Run save calls on a pool of writer threads behind a bounded queue.
+
+    submit() blocks while depth (default 2 * workers) saves are pending, so
+    finished masks can't pile up in memory when the disk is slower than the
+    model. close() waits for every pending save; failures are collected in
+    errors as (name, exception) instead of being raised.
+    """
+
+    def __init__(self, workers=DEFAULT_WRITERS, depth=None):
+        self.workers = workers
+        self.written = 0
+        self.errors = []
+        self._lock = threading.Lock()
+        self._executor = None
+        if workers > 0:
+            self._slots = threading.BoundedSemaphore(depth or workers * 2)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mask-writer')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, name, fn, *args):
+        """Call fn(*args) on a writer thread; name identifies it in errors."""
+        if self._executor is None:
+            self._run(name, fn, *args)
+            return
+        self._slots.acquire()
+        try:
+            self._executor.submit(self._run, name, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _run(self, name, fn, *args):
+        try:
+            fn(*args)
+            with self._lock:
+                self.written += 1
+        except Exception as e:
+            with self._lock:
+                self.errors.append((name, e))
+        finally:
+            if self._executor is not None:
+                self._slots.release()
+
+    def close(self):
+        """Wait for all pending saves; returns the number that succeeded."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        return self.written
+
+def run_folder(engine, paths, save_fn, keep_images=False, batch_size=DEFAULT_BATCH_SIZE, prefetch=None,
+               writers=DEFAULT_WRITERS, desc="Creating masks"):
+    """
+    Create a mask for every image file in paths; returns the number saved.
+
+    Images are loaded and preprocessed ahead of the model by prefetch_batches
+    (prefetch: its workers, depth, processes and preprocessing arguments),
+    masked by engine.process_tensors one batch at a time, and saved with
+    save_fn(path, image, mask) on `writers` MaskWriter threads while the next
+    batch runs. image is the loaded PIL image with keep_images, else None.
+    Load, model and save errors are printed and skip the images involved.
+    """
+    batches = prefetch_batches(paths, engine.input_size, batch_size, keep_images=keep_images,
+                               **(prefetch or {}))
+    writer = MaskWriter(writers)
+    with tqdm(total=len(paths), desc=desc) as progress, writer:
+        for loaded, failed in batches:
+            for path, error in failed:
+                print(f"Error processing {path.name}: {error}")
+
+            tensors = [tensor for _, _, tensor, _ in loaded]
+            sizes = [size for _, _, _, size in loaded]
+            try:
+                # One forward pass per batch
+                masks = engine.process_tensors(tensors, sizes) if loaded else []
+            except Exception as e:
+                print(f"Error processing batch {loaded[0][0].name}..{loaded[-1][0].name}: {e}")
+                masks = []
+
+            for (path, image, _, _), mask in zip(loaded, masks):
+                writer.submit(path.name, save_fn, path, image, mask)
+
+            progress.update(len(loaded) + len(failed))
+
+    for name, error in writer.errors:
+        print(f"Error saving {name}: {error}")
+
+    return writer.written
+
+class BiRefNetEngine:
+    def __init__(self, model_path, device, input_size=(1024, 1024)):
+        # Imported here because each script puts its own BiRefNet checkout on
+        # sys.path before creating a model
+        from models.birefnet import BiRefNet
+        from utils import check_state_dict
+
+        print(f"Loading BiRefNet model on {device}...")
+
+        self.device = device
+        self.input_size = input_size
+
+        # Initialize model
+        self.model = BiRefNet(bb_pretrained=False)
+
+        # Load weights
+        if os.path.exists(model_path):
+            state_dict = torch.load(model_path, map_location=device)
+            if 'module.' in list(state_dict.keys())[0]:
+                state_dict = check_state_dict(state_dict, unwanted_prefix='module.')
+            self.model.load_state_dict(state_dict)
+        else:
+            raise FileNotFoundError(f"Model weights not found at {model_path}")
+
+        self.model.to(device)
+        self.model.eval()
+
+        self._batch_buffer = None
+
+        print(f"✓ BiRefNet model loaded successfully on {device}")
+
+    def preprocess_image(self, image):
+        """Preprocess image for BiRefNet"""
+        return preprocess_image(image, self.input_size)
+
+    def postprocess_mask(self, mask, original_size):
+        """Postprocess one model output to a 0-255 mask at original_size (width, height)"""
+        mask = torch.sigmoid(mask)
+        mask = F.interpolate(
+            mask.unsqueeze(0),
+            size=(original_size[1], original_size[0]),
+            mode='bilinear',
+            align_corners=False
+        ).squeeze(0)
+        mask = mask.cpu().numpy().squeeze()
+        mask = (mask * 255).astype(np.uint8)
+        return mask
+
+    def get_batch_buffer(self, shape):
+        """Float32 model input buffer of the given (B, 3, H, W) shape, reused across batches"""
+        buffer = self._batch_buffer
+        if buffer is None or buffer.shape[1:] != shape[1:] or buffer.shape[0] < shape[0]:
+            buffer = self._batch_buffer = torch.empty(shape, dtype=torch.float32, device=self.device)
+        return buffer[:shape[0]]
+
+    @torch.no_grad()
+    def predict_batch(self, tensors):
+        """
+        Run one forward pass over a list of preprocessed tensors; returns the
+        (B, 1, H, W) logits. uint8 tensors from the 'tensor' preprocessing path
+        are normalized here, into the reused batch buffer.
+        """
+        batch = torch.stack(tensors).to(self.device)
+        if batch.dtype == torch.uint8:
+            batch = normalize_batch(batch, out=self.get_batch_buffer(batch.shape))
+        outputs = self.model(batch)
+        if isinstance(outputs, list):
+            outputs = outputs[-1]
+        return outputs
+
+    @torch.no_grad()
+    def process_batch(self, images, output_sizes=None):
+        """
+        Masks for a list of PIL images from a single forward pass
+
+        output_sizes gives a (width, height) per image (None entries mean the
+        image's own size), e.g. the full frame size of reduced-resolution decodes.
+        """
+        tensors, sizes = zip(*(self.preprocess_image(image) for image in images))
+        if output_sizes is not None:
+            sizes = [output_size or size for output_size, size in zip(output_sizes, sizes)]
+        return self.process_tensors(list(tensors), sizes)
+
+    @torch.no_grad()
+    def process_tensors(self, tensors, sizes):
+        """Masks for already preprocessed tensors (e.g. from prefetch_batches), one forward pass"""
+        masks = self.predict_batch(tensors)
+        return [self.postprocess_mask(mask, size) for mask, size in zip(masks, sizes)]
+
+    def process_image(self, image, output_size=None):
+        """Process single image with BiRefNet"""
+        return self.process_batch([image], [output_size])[0]
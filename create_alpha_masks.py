@@ -12,11 +12,14 @@ USAGE INSTRUCTIONS:
 """
 
 import os
+import argparse
 import numpy as np
 from PIL import Image
 from tqdm import tqdm
 from pathlib import Path
 
+import sharding
+
 # ============================================================================
 # USER CONFIGURATION - EDIT THESE VALUES FOR YOUR PROJECT
 # ============================================================================
@@ -83,7 +86,7 @@ def rgba_to_alpha_mask(rgba_image, threshold=ALPHA_THRESHOLD):
     # Convert to PIL Image
     return Image.fromarray(alpha_mask, mode='L')
 
-def process_folder(input_folder, output_folder, threshold=ALPHA_THRESHOLD):
+def process_folder(input_folder, output_folder, threshold=ALPHA_THRESHOLD, shard=None):
     """
     Process all supported image files in folder to create alpha masks
 
@@ -91,6 +94,8 @@ def process_folder(input_folder, output_folder, threshold=ALPHA_THRESHOLD):
         input_folder: Path to input folder
         output_folder: Path to output folder
         threshold: Alpha threshold for processing
+        shard: Optional (i, N) - only process this node's share of the images
+               (split by path relative to the base directory, see sharding.py)
     """
     input_path = Path(input_folder)
     output_path = Path(output_folder)
@@ -109,6 +114,11 @@ def process_folder(input_folder, output_folder, threshold=ALPHA_THRESHOLD):
         print(f"Looking for extensions: {SUPPORTED_EXTENSIONS}")
         return
 
+    if shard is not None:
+        found = len(image_files)
+        image_files = sharding.select_shard(image_files, shard, input_path.parent)
+        print(f"Shard {sharding.format_shard(shard)}: {len(image_files)} of {found} files")
+
     print(f"Converting {len(image_files)} files to alpha masks...")
     print(f"Using threshold: {threshold}")
 
@@ -133,12 +143,13 @@ def process_folder(input_folder, output_folder, threshold=ALPHA_THRESHOLD):
 
     print(f"✓ {success_count}/{len(image_files)} alpha masks saved to {output_folder}")
 
-def process_single_folder(input_folder):
+def process_single_folder(input_folder, shard=None):
     """
     Process a single input folder and create corresponding output folder
 
     Args:
         input_folder: Path to folder ending with INPUT_SUFFIX
+        shard: Optional (i, N) node shard, see process_folder
     """
     folder_name = Path(input_folder).name
 
@@ -152,7 +163,7 @@ def process_single_folder(input_folder):
     output_folder = Path(input_folder).parent / output_folder_name
 
     print(f"\n--- Converting {folder_name} -> {output_folder_name} ---")
-    process_folder(input_folder, str(output_folder))
+    process_folder(input_folder, str(output_folder), shard=shard)
 
 def find_input_folders(base_directory, suffix):
     """
@@ -185,6 +196,11 @@ def main():
     """
     Main function - processes all input folders to create alpha masks
     """
+    parser = argparse.ArgumentParser(description='Convert RGBA/RGB masks in every '
+                                                 f'*{INPUT_SUFFIX} folder of BASE_DIR to alpha masks')
+    sharding.add_shard_argument(parser)
+    args = parser.parse_args()
+
     print("BiRefNet RGBA to Alpha Mask Converter")
     print("Converts RGBA/RGB images to pure black/white alpha masks")
     print("Black = Background, White = Person/Foreground")
@@ -207,6 +223,8 @@ def main():
     print(f"  Output Suffix: '{OUTPUT_SUFFIX}' (will create folders like 'Cam0{OUTPUT_SUFFIX}')")
     print(f"  Alpha Threshold: {ALPHA_THRESHOLD} (lower=more inclusive, higher=stricter)")
     print(f"  Supported Extensions: {SUPPORTED_EXTENSIONS}")
+    if args.shard is not None:
+        print(f"  Shard: {sharding.format_shard(args.shard)}")
     print("=" * 70)
 
     # Find all input folders
@@ -236,7 +254,7 @@ def main():
 
     # Process each input folder
     for input_folder in sorted(input_folders):
-        process_single_folder(str(input_folder))
+        process_single_folder(str(input_folder), args.shard)
 
     print(f"\n{'='*60}")
     print("✓ All alpha masks created successfully!")
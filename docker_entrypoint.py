@@ -94,7 +94,9 @@ def main():
 
     # Run the selected script
     try:
-        subprocess.run([sys.executable, script_to_run], check=True)
+        # Extra arguments (e.g. --shard 0/4) go to the script; SHARD in the
+        # environment is inherited as well
+        subprocess.run([sys.executable, script_to_run] + sys.argv[2:], check=True)
         print("✅ Processing completed successfully!")
     except subprocess.CalledProcessError as e:
         print(f"❌ Processing failed with exit code {e.returncode}")
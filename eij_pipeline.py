@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Import shim for 8ij_to_png_pipeline.py.
+
+The pipeline module name starts with a digit, so it cannot be imported with a
+plain import statement. Scripts that build on it use
+
+    from eij_pipeline import pipeline
+
+instead of repeating the import_module call and the sys.path setup.
+"""
+
+import sys
+import importlib
+from pathlib import Path
+
+# The pipeline lives next to this file, whatever directory a script is run from
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+pipeline = importlib.import_module('8ij_to_png_pipeline')
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Chunked frame store - keeps a whole frame sequence in a few large files
+instead of one image file per frame.
+
+A store is a directory (e.g. "take1.frames/") holding:
+- store.json: frame shape/dtype, codec and a table of frame index → chunk, offset, size
+- chunk_000000.bin, chunk_000001.bin, ...: up to chunk_frames compressed frames each
+
+Every frame is compressed on its own, so reading any single frame is one read
+plus one decompress, while reading a clip is a handful of large sequential reads.
+
+Usage:
+    store = FrameStore('out/take1.frames')
+    frame = store[4000]                       # random access by frame index
+    for frame_index, frame in store.iter_frames(range(4000, 4100)):
+        ...
+"""
+
+import os
+import json
+import zlib
+from pathlib import Path
+import numpy as np
+
+try:
+    import imagecodecs
+    HAVE_ZSTD = imagecodecs.ZSTD.available
+except (ImportError, AttributeError):
+    HAVE_ZSTD = False
+
+STORE_SUFFIX = '.frames'
+STORE_META = 'store.json'
+STORE_VERSION = 1
+DEFAULT_CHUNK_FRAMES = 256
+DEFAULT_CODEC = 'zstd' if HAVE_ZSTD else 'zlib'
+CODECS = ['zstd', 'zlib', 'none']
+
+def compress_frame(frame, codec=DEFAULT_CODEC):
+    """Compress one frame's raw bytes with the given codec."""
+    data = np.ascontiguousarray(frame).tobytes()
+    if codec == 'zstd':
+        return imagecodecs.zstd_encode(data, level=3)
+    if codec == 'zlib':
+        return zlib.compress(data, 1)
+    if codec == 'none':
+        return data
+    raise ValueError(f"Unknown store codec: {codec}")
+
+def decompress_frame(data, codec):
+    """Inverse of compress_frame; returns raw bytes."""
+    if codec == 'zstd':
+        return imagecodecs.zstd_decode(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'none':
+        return data
+    raise ValueError(f"Unknown store codec: {codec}")
+
+class FrameStoreWriter:
+    """
+    Append frames (in order) to a new frame store.
+
+    Frames must all share one shape and dtype. Pass already-compressed data
+    to add_compressed() to compress on other threads. store.json is written
+    on close(), so an interrupted write never looks like a complete store.
+    """
+
+    def __init__(self, store_path, chunk_frames=DEFAULT_CHUNK_FRAMES, codec=DEFAULT_CODEC, source=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown store codec: {codec}")
+        if codec == 'zstd' and not HAVE_ZSTD:
+            raise ImportError("imagecodecs with zstd support is required for the zstd store codec")
+
+        self.path = Path(store_path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        # A previous store.json would describe chunks we are about to overwrite
+        (self.path / STORE_META).unlink(missing_ok=True)
+
+        self.chunk_frames = chunk_frames
+        self.codec = codec
+        self.source = source
+        self.shape = None
+        self.dtype = None
+        self.frames = []        # [frame_index, chunk, offset, size]
+        self._chunk = -1
+        self._chunk_file = None
+        self._chunk_count = 0
+        self._offset = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._chunk_file is not None:
+            self._chunk_file.close()
+
+    def add(self, frame_index, frame):
+        """Compress and append one frame."""
+        self.add_compressed(frame_index, compress_frame(frame, self.codec), frame.shape, frame.dtype)
+
+    def add_compressed(self, frame_index, data, shape, dtype):
+        """Append one frame already compressed with this store's codec."""
+        if self.shape is None:
+            self.shape = tuple(shape)
+            self.dtype = np.dtype(dtype)
+        elif tuple(shape) != self.shape or np.dtype(dtype) != self.dtype:
+            raise ValueError(f"Frame {frame_index} is {tuple(shape)} {np.dtype(dtype)}, "
+                             f"store holds {self.shape} {self.dtype}")
+
+        if self._chunk_file is None or self._chunk_count >= self.chunk_frames:
+            self._next_chunk()
+
+        self._chunk_file.write(data)
+        self.frames.append([int(frame_index), self._chunk, self._offset, len(data)])
+        self._offset += len(data)
+        self._chunk_count += 1
+
+    def _next_chunk(self):
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+        self._chunk += 1
+        self._chunk_file = open(self.path / chunk_name(self._chunk), 'wb')
+        self._chunk_count = 0
+        self._offset = 0
+
+    def close(self):
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+            self._chunk_file = None
+
+        meta_path = self.path / STORE_META
+        tmp_path = meta_path.with_name(meta_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': STORE_VERSION,
+                'source': self.source,
+                'shape': list(self.shape) if self.shape else None,
+                'dtype': self.dtype.str if self.dtype is not None else None,
+                'codec': self.codec,
+                'chunk_frames': self.chunk_frames,
+                'frames': self.frames,
+            }, f)
+        os.replace(tmp_path, meta_path)
+
+def chunk_name(chunk):
+    return f"chunk_{chunk:06d}.bin"
+
+class FrameStore:
+    """Read-only random access to a frame store written by FrameStoreWriter."""
+
+    def __init__(self, store_path):
+        self.path = Path(store_path)
+        with open(self.path / STORE_META, 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported frame store version in {self.path}: {meta.get('version')}")
+
+        self.source = meta['source']
+        self.codec = meta['codec']
+        self.shape = tuple(meta['shape']) if meta['shape'] else None
+        self.dtype = np.dtype(meta['dtype']) if meta['dtype'] else None
+        self._frames = meta['frames']
+        self._by_index = {entry[0]: entry for entry in self._frames}
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, frame_index):
+        return frame_index in self._by_index
+
+    def __getitem__(self, frame_index):
+        try:
+            entry = self._by_index[frame_index]
+        except KeyError:
+            raise KeyError(f"Frame {frame_index} not found in {self.path}") from None
+        with open(self.path / chunk_name(entry[1]), 'rb') as f:
+            f.seek(entry[2])
+            return self._decode(f.read(entry[3]))
+
+    @property
+    def frame_indices(self):
+        """Frame indices in stored order."""
+        return [entry[0] for entry in self._frames]
+
+    def _decode(self, data):
+        raw = decompress_frame(data, self.codec)
+        return np.frombuffer(raw, dtype=self.dtype).reshape(self.shape)
+
+    def iter_frames(self, frames=None):
+        """
+        Yield (frame_index, ndarray) in stored order, optionally restricted to
+        a collection of frame indices. Each chunk file is opened once.
+        """
+        chunk = None
+        f = None
+        try:
+            for frame_index, entry_chunk, offset, size in self._frames:
+                if frames is not None and frame_index not in frames:
+                    continue
+                if entry_chunk != chunk:
+                    if f is not None:
+                        f.close()
+                    chunk = entry_chunk
+                    f = open(self.path / chunk_name(chunk), 'rb')
+                f.seek(offset)
+                yield frame_index, self._decode(f.read(size))
+        finally:
+            if f is not None:
+                f.close()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Inspect .8ij captures without decoding them.
+
+Reads only the 12-byte frame headers (or the cached .8ij.idx frame index) and
+reports frame count, JPEG payload sizes, frame index range, index gaps and a
+truncated tail, plus the frame geometry from the first JPEG header. A few
+sample frames are decoded to estimate how long a full decode would take.
+
+Usage:
+    python inspect_8ij.py capture.8ij
+    python inspect_8ij.py /path/to/captures --sample 0     # headers only
+    python inspect_8ij.py /path/to/captures --json > plan.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+from eij_pipeline import pipeline
+
+DEFAULT_SAMPLE = 5
+MAX_GAPS_SHOWN = 10
+
+def find_index_gaps(entries):
+    """
+    Return (gaps, out_of_order) for a file's frame entries: gaps lists
+    (last index before, next index after) for every jump in the frame index,
+    out_of_order counts frames whose index does not increase.
+    """
+    gaps = []
+    out_of_order = 0
+    for prev, entry in zip(entries, entries[1:]):
+        if entry.index <= prev.index:
+            out_of_order += 1
+        elif entry.index != prev.index + 1:
+            gaps.append((prev.index, entry.index))
+    return gaps, out_of_order
+
+def estimate_decode_seconds(eij, sample=DEFAULT_SAMPLE):
+    """
+    Decode `sample` evenly spaced frames and extrapolate the single-threaded
+    decode time of the whole file from their seconds per payload byte.
+    Returns None when nothing could be sampled.
+    """
+    if not sample or not eij.frames:
+        return None
+    step = max(len(eij.frames) // sample, 1)
+    sampled = eij.frames[::step][:sample]
+
+    sampled_bytes = 0
+    start_time = time.perf_counter()
+    for entry in sampled:
+        jpeg_data = eij.read_entry(entry)
+        try:
+            if pipeline.decode_12bit_jpeg(jpeg_data) is not None:
+                sampled_bytes += entry.size
+        finally:
+            jpeg_data.release()
+    elapsed = time.perf_counter() - start_time
+
+    if not sampled_bytes:
+        return None
+    return elapsed / sampled_bytes * sum(entry.size for entry in eij.frames)
+
+def inspect_8ij(input_path, sample=DEFAULT_SAMPLE, rebuild_index=False):
+    """Collect the inspection report of one .8ij file as a dict."""
+    input_path = Path(input_path)
+    file_size = input_path.stat().st_size
+
+    with pipeline.EijFile(input_path, rebuild_index=rebuild_index) as eij:
+        entries = eij.frames
+        sizes = [entry.size for entry in entries]
+        gaps, out_of_order = find_index_gaps(entries)
+
+        geometry = None
+        if entries:
+            jpeg_data = eij.read_entry(entries[0])
+            try:
+                geometry = pipeline.jpeg_frame_info(jpeg_data)
+            finally:
+                jpeg_data.release()
+
+        report = {
+            'path': str(input_path),
+            'file_size': file_size,
+            'frames': len(entries),
+            'first_index': entries[0].index if entries else None,
+            'last_index': entries[-1].index if entries else None,
+            'missing_frames': sum(after - before - 1 for before, after in gaps),
+            'gaps': gaps,
+            'out_of_order': out_of_order,
+            'jpeg_bytes': sum(sizes),
+            'min_jpeg_size': min(sizes, default=0),
+            'max_jpeg_size': max(sizes, default=0),
+            'avg_jpeg_size': sum(sizes) / len(sizes) if sizes else 0,
+            'geometry': dict(zip(['precision', 'height', 'width', 'components'], geometry)) if geometry else None,
+            'stop_reason': eij.stop_reason,
+            'truncated_frame': None,
+            'trailing_bytes': 0,
+            'est_decode_seconds': estimate_decode_seconds(eij, sample),
+        }
+
+        if eij.incomplete is not None:
+            report['truncated_frame'] = {
+                'index': eij.incomplete.index,
+                'declared_size': eij.incomplete.size,
+                'bytes_present': file_size - eij.incomplete.offset,
+            }
+        else:
+            end_offset = entries[-1].offset + entries[-1].size if entries else 0
+            report['trailing_bytes'] = file_size - end_offset
+
+    return report
+
+def print_report(report, threads=1):
+    """Print one file's report in human-readable form."""
+    print(f"\n📄 {report['path']} ({report['file_size']/1e9:.2f} GB)")
+    if not report['frames']:
+        print(f"  ❌ No complete frames (stop reason: {report['stop_reason']})")
+        return
+
+    print(f"  🎞️  Frames: {report['frames']} (index {report['first_index']} → {report['last_index']})")
+    geometry = report['geometry']
+    if geometry:
+        print(f"  🖼️  Frame: {geometry['width']}x{geometry['height']}, {geometry['components']} "
+              f"component(s), {geometry['precision']}-bit JPEG")
+    print(f"  📦 JPEG size: min {report['min_jpeg_size']/1e3:.1f} KB | max {report['max_jpeg_size']/1e3:.1f} KB | "
+          f"avg {report['avg_jpeg_size']/1e3:.1f} KB")
+
+    if report['gaps']:
+        print(f"  ⚠️  {len(report['gaps'])} index gap(s), {report['missing_frames']} frame(s) missing:")
+        for before, after in report['gaps'][:MAX_GAPS_SHOWN]:
+            print(f"      {before} → {after}")
+        if len(report['gaps']) > MAX_GAPS_SHOWN:
+            print(f"      ... {len(report['gaps']) - MAX_GAPS_SHOWN} more")
+    if report['out_of_order']:
+        print(f"  ⚠️  {report['out_of_order']} frame(s) with a non-increasing index")
+
+    truncated = report['truncated_frame']
+    if truncated:
+        print(f"  ⚠️  Truncated tail: frame {truncated['index']} has {truncated['bytes_present']} of "
+              f"{truncated['declared_size']} bytes")
+    elif report['trailing_bytes']:
+        print(f"  ⚠️  {report['trailing_bytes']} trailing byte(s) after the last frame "
+              f"({report['stop_reason']})")
+
+    seconds = report['est_decode_seconds']
+    if seconds is not None:
+        print(f"  ⏱️  Est. decode time: {seconds:.1f}s on 1 thread, {seconds/max(threads, 1):.1f}s on {threads}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect .8ij files from their frame headers, without decoding')
+    parser.add_argument('input', help='Input .8ij file or directory')
+    parser.add_argument('--sample', type=int, default=DEFAULT_SAMPLE,
+                       help=f'Frames to decode per file for the decode time estimate; 0 to skip '
+                            f'(default: {DEFAULT_SAMPLE})')
+    parser.add_argument('--threads', type=int, default=1,
+                       help='Also show the decode time estimate for this many threads (default: 1)')
+    parser.add_argument('--rebuild-index', action='store_true',
+                       help='Rescan frame headers instead of reusing the cached .8ij.idx sidecar')
+    parser.add_argument('--json', action='store_true',
+                       help='Print the reports as JSON')
+
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    if input_path.is_file():
+        eij_files = [input_path]
+    elif input_path.is_dir():
+        eij_files = sorted(input_path.glob('**/*.8ij'))
+    else:
+        print(f"Error: {input_path} is not a valid file or directory")
+        sys.exit(1)
+
+    if not eij_files:
+        print(f"No .8ij files found in {input_path}")
+        return
+
+    reports = []
+    for eij_file in eij_files:
+        try:
+            reports.append(inspect_8ij(eij_file, args.sample, args.rebuild_index))
+        except Exception as e:
+            reports.append({'path': str(eij_file), 'error': str(e)})
+
+    if args.json:
+        json.dump(reports, sys.stdout, indent=1)
+        print()
+        return
+
+    problems = 0
+    for report in reports:
+        if 'error' in report:
+            print(f"\n📄 {report['path']}\n  💥 Error: {report['error']}")
+            problems += 1
+            continue
+        print_report(report, args.threads)
+        if (report['gaps'] or report['out_of_order'] or report['truncated_frame'] or
+                report['trailing_bytes'] or not report['frames']):
+            problems += 1
+
+    if len(reports) > 1:
+        good = [report for report in reports if 'error' not in report]
+        total_frames = sum(report['frames'] for report in good)
+        total_bytes = sum(report['jpeg_bytes'] for report in good)
+        estimates = [report['est_decode_seconds'] for report in good]
+        print()
+        print("=" * 50)
+        print(f"📁 {len(reports)} files | 🎞️  {total_frames} frames | 📦 {total_bytes/1e9:.2f} GB of JPEG data")
+        if estimates and None not in estimates:
+            seconds = sum(estimates)
+            print(f"⏱️  Est. decode time: {seconds/60:.1f} min on 1 thread, "
+                  f"{seconds/60/max(args.threads, 1):.1f} min on {args.threads}")
+        print(f"{'⚠️ ' if problems else '✅'} {problems} file(s) with gaps, truncation or errors")
+        print("=" * 50)
+
+if __name__ == '__main__':
+    main()
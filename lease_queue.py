@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Lease-based work claiming on a shared filesystem - lets any number of
+workers, on one host or many, drain the same work list without a
+coordinator.
+
+Every worker discovers the same list of work keys (e.g. relative paths of
+.8ij files, or "file#shard" frame ranges) and claims keys through a shared
+work directory:
+- <hash>.lease: created atomically (O_EXCL) by the claiming worker and
+  touched by a heartbeat thread while the work runs
+- <hash>.done / <hash>.failed: written when the work finishes; failed
+  keys are only claimed again after LeaseQueue.retry_failed clears them
+
+Lock files are used rather than SQLite because SQLite's locking is not
+reliable over NFS. A lease whose heartbeat is older than lease_seconds is
+treated as abandoned (crashed worker) and can be reclaimed by anyone.
+Lease ages are measured against the shared filesystem's clock, so clock
+skew between nodes doesn't matter.
+
+Claims are at-least-once: a worker that stalls for longer than its lease
+can lose the key to another worker, and notices at its next heartbeat
+(Lease.lost). Work should therefore be safe to repeat, as frame extraction
+is (frames are written atomically).
+
+Usage:
+    queue = LeaseQueue('/nfs/work/convert-run1')
+    for lease in queue.drain(keys):
+        try:
+            process(lease.key)
+            lease.complete()
+        except Exception as e:
+            lease.fail(str(e))
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from pathlib import Path
+
+LEASE_SUFFIX = '.lease'
+DONE_SUFFIX = '.done'
+FAILED_SUFFIX = '.failed'
+DEFAULT_LEASE_SECONDS = 300
+
+def default_worker_id():
+    """Identify this worker as host-pid-random, unique across nodes and restarts."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+def write_json_atomic(path, data):
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def check_work_settings(work_dir, settings):
+    """Tie a work directory to one set of settings (a JSON-able dict); returns False on a mismatch."""
+    settings_path = Path(work_dir) / 'settings.json'
+    try:
+        with open(settings_path, 'r') as f:
+            return json.load(f) == settings
+    except FileNotFoundError:
+        Path(work_dir).mkdir(parents=True, exist_ok=True)
+        write_json_atomic(settings_path, settings)
+        return True
+
+class Lease:
+    """A claimed work key, kept alive by a heartbeat thread until it is completed, failed or released."""
+
+    def __init__(self, queue, key, token, reclaimed=False):
+        self.queue = queue
+        self.key = key
+        self.token = token
+        self.reclaimed = reclaimed      # Taken over from an expired lease (earlier work may be partly done)
+        self.lost = threading.Event()   # Set if another worker took the key over
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-{key}", daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self):
+        interval = self.queue.lease_seconds / 3
+        while not self._stop.wait(interval):
+            if not self.queue._renew(self):
+                self.lost.set()
+                return
+
+    def _end(self, suffix=None, info=None):
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        if suffix and not self.lost.is_set():
+            record = {'key': self.key, 'worker': self.queue.worker_id, 'time': time.time()}
+            record.update(info or {})
+            write_json_atomic(self.queue._path(self.key, suffix), record)
+            self.queue._finished.add(self.key)
+        self.queue._drop(self)
+
+    def complete(self, info=None):
+        """Mark the key done (info is stored in the .done record) and drop the lease."""
+        self._end(DONE_SUFFIX, info)
+
+    def fail(self, error=''):
+        """Mark the key failed so no worker retries it (see retry_failed), and drop the lease."""
+        self._end(FAILED_SUFFIX, {'error': error})
+
+    def release(self):
+        """Give the key back unfinished so another worker (or this one) can claim it."""
+        self._end()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._stop.is_set():
+            self.release()
+
+class LeaseQueue:
+    """Claim work keys through lock files in a shared work directory (see module docstring)."""
+
+    def __init__(self, work_dir, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.work_dir = Path(work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self._held = {}          # key -> Lease held by this worker
+        self._finished = set()   # Keys known to be done or failed (permanent)
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key, suffix):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+        return self.work_dir / (digest + suffix)
+
+    def _fs_now(self):
+        """Current time on the shared filesystem's clock (mtime of a freshly touched file)."""
+        clock_path = self.work_dir / f".clock.{self.worker_id}"
+        clock_path.touch()
+        return clock_path.stat().st_mtime
+
+    def is_finished(self, key):
+        """True if the key is done or failed."""
+        if key in self._finished:
+            return True
+        if self._path(key, DONE_SUFFIX).exists() or self._path(key, FAILED_SUFFIX).exists():
+            self._finished.add(key)
+            return True
+        return False
+
+    def _create_lease(self, key, token):
+        lease_path = self._path(key, LEASE_SUFFIX)
+        fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'key': key, 'worker': self.worker_id, 'token': token}, f)
+
+    def _lease_expired(self, lease_path):
+        try:
+            age = self._fs_now() - lease_path.stat().st_mtime
+        except FileNotFoundError:
+            return True
+        return age > self.lease_seconds
+
+    def _break_lease(self, lease_path, token):
+        """Remove an expired lease; returns False if another worker got there first."""
+        stale_path = lease_path.with_name(f"{lease_path.name}.stale.{token}")
+        try:
+            os.rename(lease_path, stale_path)
+        except FileNotFoundError:
+            # Already broken (and maybe re-claimed) by someone else
+            return False
+        if not self._lease_expired(stale_path):
+            # Lost a race and moved a fresh lease aside; put it back unless it was replaced meanwhile
+            try:
+                os.link(stale_path, lease_path)
+            except FileExistsError:
+                pass
+            stale_path.unlink(missing_ok=True)
+            return False
+        stale_path.unlink(missing_ok=True)
+        return True
+
+    def try_claim(self, key):
+        """Claim one key; returns a Lease, or None if it is finished or held by a live worker."""
+        if key in self._held or self.is_finished(key):
+            return None
+        token = uuid.uuid4().hex
+        lease_path = self._path(key, LEASE_SUFFIX)
+        reclaimed = False
+        try:
+            self._create_lease(key, token)
+        except FileExistsError:
+            if not self._lease_expired(lease_path) or not self._break_lease(lease_path, token):
+                return None
+            try:
+                self._create_lease(key, token)
+            except FileExistsError:
+                return None
+            reclaimed = True
+
+        # The previous holder may have finished between our check and our claim
+        if self.is_finished(key):
+            lease_path.unlink(missing_ok=True)
+            return None
+
+        lease = Lease(self, key, token, reclaimed)
+        with self._lock:
+            self._held[key] = lease
+        return lease
+
+    def claim_next(self, keys):
+        """
+        Claim the next available key, scanning round-robin from where the
+        last call stopped. Returns a Lease, or None if nothing is claimable now.
+        """
+        keys = list(keys)
+        for offset in range(len(keys)):
+            key = keys[(self._cursor + offset) % len(keys)]
+            lease = self.try_claim(key)
+            if lease is not None:
+                self._cursor = (self._cursor + offset + 1) % len(keys)
+                return lease
+        return None
+
+    def all_finished(self, keys):
+        """True once every key is done or failed (by any worker)."""
+        return all(self.is_finished(key) for key in keys)
+
+    def drain(self, keys, poll=None):
+        """
+        Yield Leases for keys until every key is finished. When everything
+        left is held by other workers, waits (poll seconds) for them to finish
+        or for their leases to expire. The caller must complete, fail or
+        release each lease.
+        """
+        keys = list(keys)
+        poll = poll or min(self.lease_seconds / 4, 10)
+        while True:
+            lease = self.claim_next(keys)
+            if lease is not None:
+                yield lease
+            elif self.all_finished(keys):
+                return
+            else:
+                time.sleep(poll)
+
+    def retry_failed(self, keys):
+        """Clear the .failed records of keys so they can be claimed again; returns how many were cleared."""
+        cleared = 0
+        for key in keys:
+            failed_path = self._path(key, FAILED_SUFFIX)
+            if failed_path.exists():
+                failed_path.unlink(missing_ok=True)
+                self._finished.discard(key)
+                cleared += 1
+        return cleared
+
+    def status(self, keys):
+        """Count keys by state: done, failed, leased (by anyone) and pending."""
+        counts = {'done': 0, 'failed': 0, 'leased': 0, 'pending': 0}
+        for key in keys:
+            if self._path(key, DONE_SUFFIX).exists():
+                counts['done'] += 1
+            elif self._path(key, FAILED_SUFFIX).exists():
+                counts['failed'] += 1
+            elif self._path(key, LEASE_SUFFIX).exists():
+                counts['leased'] += 1
+            else:
+                counts['pending'] += 1
+        return counts
+
+    def _renew(self, lease):
+        """Heartbeat: refresh the lease's mtime if it is still ours."""
+        lease_path = self._path(lease.key, LEASE_SUFFIX)
+        try:
+            with open(lease_path, 'r') as f:
+                if json.load(f).get('token') != lease.token:
+                    return False
+            os.utime(lease_path)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def _drop(self, lease):
+        with self._lock:
+            self._held.pop(lease.key, None)
+        lease_path = self._path(lease.key, LEASE_SUFFIX)
+        try:
+            with open(lease_path, 'r') as f:
+                ours = json.load(f).get('token') == lease.token
+        except (OSError, ValueError):
+            return
+        if ours:
+            lease_path.unlink(missing_ok=True)
+
+    def close(self):
+        """Release every lease this worker still holds."""
+        for lease in list(self._held.values()):
+            lease.release()
+        (self.work_dir / f".clock.{self.worker_id}").unlink(missing_ok=True)
@@ -3,21 +3,37 @@
 Fixed parallel .8ij to PNG converter - handles directory structure correctly
 """
 
+import io
 import os
-import sys
-import subprocess
 import time
+import heapq
+import contextlib
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import argparse
 
+import sharding
+import lease_queue
+
+# Imported at module level so each pool worker pays the numpy/imagecodecs
+# import cost once instead of once per file
+from eij_pipeline import pipeline
+
 def process_single_file(args):
-    """Process a single .8ij file with correct directory structure"""
-    input_file, base_input_dir, base_output_dir, scaling_method = args
+    """
+    Process a single .8ij file with correct directory structure.
+
+    Runs the pipeline in-process and returns its ExtractionResult. For a
+    sharded file, frames is one shard's frame range and label names it in
+    progress output.
+    """
+    (input_file, base_input_dir, base_output_dir, scaling_method, threads, tone_sequence, frames, resume,
+     output_format, stage_options, label) = args
 
     input_path = Path(input_file)
     base_input_path = Path(base_input_dir)
     base_output_path = Path(base_output_dir)
+    rel_path = input_path.name
 
     try:
         # Calculate relative path from base input directory
@@ -27,42 +43,116 @@ def process_single_file(args):
         output_dir = base_output_path / rel_path.parent
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        print(f"[{os.getpid()}] Starting: {rel_path}")
+        print(f"[{os.getpid()}] Starting: {rel_path}{label}")
 
-        # Process the single file directly to the correct output directory
-        cmd = [
-            'python3',
-            '/home/kenya/research/repos/8ij_to_png_pipeline.py',
-            str(input_file),
-            str(output_dir),
-            '--scaling', scaling_method
-        ]
+        # Keep the pipeline's per-frame logging out of the shared console,
+        # but hand it back as error details if the file fails
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            result = pipeline.process_8ij_file(input_path, output_dir, scaling_method,
+                                               threads=threads, tone_sequence=tone_sequence,
+                                               frames=frames, skip_existing=resume,
+                                               output_format=output_format, **stage_options)
 
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
-
-        if result.returncode == 0:
-            # Count the frames created
-            png_files = list(output_dir.glob(f"{input_path.stem}_frame_*.png"))
-            print(f"[{os.getpid()}] ✅ Completed: {rel_path} ({len(png_files)} frames)")
-            return True, input_file, len(png_files), ""
+        if result:
+            resumed = f", {result.frames_skipped} already done" if result.frames_skipped else ""
+            print(f"[{os.getpid()}] ✅ Completed: {rel_path}{label} ({result.frames_written} frames{resumed}, "
+                  f"{result.elapsed:.1f}s)")
         else:
-            print(f"[{os.getpid()}] ❌ Failed: {rel_path}")
-            return False, input_file, 0, result.stderr
+            print(f"[{os.getpid()}] ❌ Failed: {rel_path}{label}")
+            result.error = result.error or log.getvalue()
+        return result
 
-    except subprocess.TimeoutExpired:
-        print(f"[{os.getpid()}] ⏰ Timeout: {rel_path}")
-        return False, input_file, 0, "Process timeout"
     except Exception as e:
-        print(f"[{os.getpid()}] 💥 Error: {rel_path} - {e}")
-        return False, input_file, 0, str(e)
+        print(f"[{os.getpid()}] 💥 Error: {rel_path}{label} - {e}")
+        return pipeline.ExtractionResult(input_file, error=str(e))
 
 def find_8ij_files(input_dir):
     """Find all .8ij files in the input directory"""
     input_path = Path(input_dir)
     return list(input_path.glob('**/*.8ij'))
 
-def parallel_convert(input_dir, output_dir, max_workers=6, scaling_method='linear'):
-    """Convert all .8ij files using parallel processing with correct directory structure"""
+def get_manifest_name(shard=None):
+    """Manifest file name; each node shard keeps its own so nodes never overwrite each other's."""
+    if shard is None:
+        return pipeline.MANIFEST_NAME
+    return f".8ij_manifest.shard{shard[0]}of{shard[1]}.json"
+
+def estimate_file_costs(eij_files, input_dir, manifest, settings):
+    """
+    Predict the conversion time in seconds of each .8ij file.
+
+    A file converted before with the same settings is predicted to take as
+    long as it did then; other files are predicted from their size and the
+    seconds per byte seen across the manifest. Returns a dict of path ->
+    seconds, or path -> None when the manifest has no timing history yet.
+    """
+    history = [entry for entry in manifest['files'].values() if entry.get('elapsed')]
+    history_bytes = sum(entry['source_size'] for entry in history)
+    seconds_per_byte = sum(entry['elapsed'] for entry in history) / history_bytes if history_bytes else None
+
+    costs = {}
+    for eij_file in eij_files:
+        entry = manifest['files'].get(str(Path(eij_file).relative_to(input_dir)))
+        if entry and entry.get('elapsed') and pipeline.manifest_entry_matches(entry, eij_file, settings):
+            costs[eij_file] = entry['elapsed']
+        elif seconds_per_byte is not None:
+            costs[eij_file] = Path(eij_file).stat().st_size * seconds_per_byte
+        else:
+            costs[eij_file] = None
+    return costs
+
+def predict_makespan(costs, max_workers):
+    """Wall-clock time of running jobs with these costs in order, each on the first free worker."""
+    workers = [0.0] * min(max_workers, len(costs))
+    for cost in costs:
+        heapq.heapreplace(workers, workers[0] + cost)
+    return max(workers, default=0.0)
+
+def prepare_shards(eij_file, shards, scaling_method, tone_sequence, frames, threads):
+    """
+    Split one .8ij into frame ranges for separate workers (see split_frame_ranges).
+
+    Builds the frame index and any sequence statistics up front, so shards
+    share the cached sidecars instead of each computing (and writing) them.
+
+    A file with no (selected) frames becomes one job for the whole file, as
+    without sharding, so it is still converted, reported and recorded.
+    """
+    shard_ranges = pipeline.split_frame_ranges(eij_file, shards, frames)
+    if not shard_ranges:
+        return [(frames, None, None)]
+    frame_dependent = pipeline.parse_scaling_method(scaling_method)[0] in ('auto', 'percentile')
+    if len(shard_ranges) > 1 and frame_dependent and tone_sequence:
+        with pipeline.EijFile(eij_file) as eij:
+            pipeline.load_sequence_histograms(eij, threads)
+    return shard_ranges
+
+def parallel_convert(input_dir, output_dir, max_workers=6, scaling_method='linear', threads=1,
+                     tone_sequence=None, frames=None, force=False, output_format='png', writers=0,
+                     queue_depth=None, memory_cap=None, schedule='largest', shards=1, shard=None):
+    """
+    Convert all .8ij files using parallel processing with correct directory structure.
+
+    writers, queue_depth and memory_cap set up the per-file read/decode/write
+    stages (see process_8ij_file); threads is then the decoder count.
+
+    schedule='largest' submits the files predicted to take longest first
+    (from past timings in the manifest, else file size), so one big take
+    found last doesn't leave the other workers idle at the end of the run.
+    schedule='glob' keeps discovery order.
+
+    shards > 1 splits each file into that many contiguous frame ranges of
+    similar size, converted by separate workers, so a single huge take can
+    use every worker. Shard results are merged per file for the manifest.
+
+    shard=(i, N) converts only the files of node shard i (see sharding.py),
+    so N nodes sharing one tree can split the work without coordination.
+
+    Progress is recorded in a manifest at the root of output_dir. Re-running
+    skips files already converted with the same settings and resumes
+    partially converted ones frame by frame; force reconverts everything.
+    """
 
     print(f"🔍 Scanning for .8ij files in {input_dir}")
     eij_files = find_8ij_files(input_dir)
@@ -71,21 +161,111 @@ def parallel_convert(input_dir, output_dir, max_workers=6, scaling_method='linea
         print("❌ No .8ij files found!")
         return
 
+    if shard is not None:
+        found = len(eij_files)
+        eij_files = sharding.select_shard(eij_files, shard, input_dir)
+        print(f"🧩 Shard {sharding.format_shard(shard)}: {len(eij_files)} of {found} .8ij files")
+        if not eij_files:
+            print("✅ Nothing to do in this shard")
+            return
+
     print(f"📁 Found {len(eij_files)} .8ij files")
     print(f"🚀 Using {max_workers} parallel workers")
-    print(f"📊 Scaling method: {scaling_method}")
+    print(f"📊 Scaling method: {scaling_method}" + (f" (tone sequence: {tone_sequence})" if tone_sequence else ""))
+    print(f"🖼️  Output format: {output_format}")
+    print(f"🧵 Threads per file: {threads}")
+    if shards > 1:
+        print(f"✂️  Splitting each file into up to {shards} frame ranges")
+    if writers:
+        cap = f", memory cap {memory_cap / 1024 / 1024:.0f} MB" if memory_cap else ""
+        print(f"🔀 Staged pipeline: {threads} decoder(s), {writers} writer(s){cap}")
+    if frames is not None:
+        print(f"🎞️  Frame selection: {frames}")
     print(f"📂 Preserving directory structure")
     print()
 
-    # Prepare arguments for each file
-    file_args = []
+    # Settings that change the output; files converted with other settings are redone
+    settings = {
+        'scaling': scaling_method,
+        'tone_sequence': tone_sequence,
+        'frames': repr(frames) if frames is not None else None,
+        'format': output_format,
+    }
+    manifest_name = get_manifest_name(shard)
+    manifest = pipeline.load_manifest(output_dir, manifest_name)
+    # Predict before files are marked as started, which drops their past timings
+    costs = estimate_file_costs(eij_files, input_dir, manifest, settings)
+
+    # Pipeline tuning that doesn't change the output
+    stage_options = {'writers': writers, 'queue_depth': queue_depth, 'memory_cap': memory_cap}
+
+    # Pick the files to convert, skipping files already done
+    todo = []
+    already_done = 0
     for eij_file in eij_files:
-        file_args.append((eij_file, input_dir, output_dir, scaling_method))
+        rel_key = str(Path(eij_file).relative_to(input_dir))
+        entry = manifest['files'].get(rel_key)
+        resume = not force and pipeline.manifest_entry_matches(entry, eij_file, settings)
+        if resume and entry['complete']:
+            already_done += 1
+            continue
+
+        # Record the file as started so a crash leaves a resumable entry behind
+        manifest['files'][rel_key] = pipeline.manifest_entry(eij_file, settings)
+        todo.append((eij_file, resume))
+
+    if already_done:
+        print(f"⏭️  Skipping {already_done} file(s) already converted (use --force to redo)")
+    if not todo:
+        print("✅ Nothing to do, all files are already converted")
+        return
+
+    # One job per file, or per contiguous frame range when files are sharded
+    file_args = []
+    job_costs = []
+    for eij_file, resume in todo:
+        if shards > 1:
+            shard_ranges = prepare_shards(eij_file, shards, scaling_method, tone_sequence, frames, max_workers)
+        else:
+            shard_ranges = [(frames, None, None)]
+        total_bytes = sum(run_bytes or 0 for _, _, run_bytes in shard_ranges)
+        for part, (shard_frames, count, run_bytes) in enumerate(shard_ranges):
+            label = f" [shard {part + 1}/{len(shard_ranges)}, {count} frames]" if len(shard_ranges) > 1 else ""
+            file_args.append((eij_file, input_dir, output_dir, scaling_method, threads, tone_sequence,
+                              shard_frames, resume, output_format, stage_options, label))
+            cost = costs[eij_file]
+            if cost is not None and total_bytes:
+                cost *= run_bytes / total_bytes
+            job_costs.append(cost)
+
+    # Longest-processing-time first: file size orders files with no history
+    jobs = list(zip(file_args, job_costs))
+    if schedule == 'largest':
+        jobs.sort(key=lambda job: (job[1] or 0, Path(job[0][0]).stat().st_size), reverse=True)
+    predicted = [cost for _, cost in jobs]
+    predicted_makespan = predict_makespan(predicted, max_workers) if None not in predicted else None
+    if predicted_makespan is not None:
+        print(f"🗓️  Schedule: {schedule} | Predicted makespan: {predicted_makespan/60:.1f} min")
+    else:
+        print(f"🗓️  Schedule: {schedule} | No timing history yet to predict makespan")
+
+    pipeline.save_manifest(output_dir, manifest, manifest_name)
+    eij_files = [eij_file for eij_file, _ in todo]
+
+    # Shard results of each file, merged once its last shard finishes
+    shards_left = {}
+    shard_results = {}
+    for args, _ in jobs:
+        shards_left[args[0]] = shards_left.get(args[0], 0) + 1
+        shard_results[args[0]] = []
 
     # Track progress
     completed = 0
     failed = 0
     total_frames = 0
+    total_bytes_read = 0
+    total_bytes_written = 0
+    total_worker_time = 0.0
     start_time = time.time()
 
     # Process files in parallel
@@ -93,35 +273,47 @@ def parallel_convert(input_dir, output_dir, max_workers=6, scaling_method='linea
         # Submit all jobs
         future_to_file = {
             executor.submit(process_single_file, args): args[0]
-            for args in file_args
+            for args, _ in jobs
         }
 
         # Process results as they complete
         for future in as_completed(future_to_file):
             file_path = future_to_file[future]
             try:
-                success, input_file, frame_count, error_msg = future.result()
-                if success:
-                    completed += 1
-                    total_frames += frame_count
-                else:
-                    failed += 1
-                    if error_msg:
-                        print(f"   Error details: {error_msg}")
-
-                # Progress update
-                total_processed = completed + failed
-                elapsed = time.time() - start_time
-                avg_time = elapsed / total_processed if total_processed > 0 else 0
-                remaining = len(eij_files) - total_processed
-                eta = remaining * avg_time / max_workers if avg_time > 0 else 0
-
-                print(f"📊 Progress: {total_processed}/{len(eij_files)} ({completed} ✅, {failed} ❌) | "
-                      f"Frames: {total_frames} | ETA: {eta/60:.1f} min")
-
+                result = future.result()
             except Exception as e:
-                failed += 1
                 print(f"💥 Exception processing {Path(file_path).name}: {e}")
+                result = pipeline.ExtractionResult(file_path, error=str(e))
+            total_worker_time += result.elapsed
+
+            shard_results[file_path].append(result)
+            shards_left[file_path] -= 1
+            if shards_left[file_path]:
+                continue
+            result = pipeline.ExtractionResult.combine(file_path, shard_results.pop(file_path))
+
+            rel_key = str(Path(file_path).relative_to(input_dir))
+            manifest['files'][rel_key] = pipeline.manifest_entry(file_path, settings, result)
+            pipeline.save_manifest(output_dir, manifest, manifest_name)
+            if result:
+                completed += 1
+                total_frames += result.frames_written
+                total_bytes_read += result.bytes_read
+                total_bytes_written += result.bytes_written
+            else:
+                failed += 1
+                if result.error:
+                    print(f"   Error details: {result.error}")
+
+            # Progress update
+            total_processed = completed + failed
+            elapsed = time.time() - start_time
+            avg_time = elapsed / total_processed if total_processed > 0 else 0
+            remaining = len(eij_files) - total_processed
+            eta = remaining * avg_time / max_workers if avg_time > 0 else 0
+
+            print(f"📊 Progress: {total_processed}/{len(eij_files)} ({completed} ✅, {failed} ❌) | "
+                  f"Frames: {total_frames} | ETA: {eta/60:.1f} min")
 
     # Final summary
     total_time = time.time() - start_time
@@ -132,7 +324,142 @@ def parallel_convert(input_dir, output_dir, max_workers=6, scaling_method='linea
     print(f"❌ Failed: {failed}")
     print(f"🎞️  Total frames: {total_frames}")
     print(f"⏱️  Total time: {total_time/60:.1f} minutes")
+    if predicted_makespan is not None:
+        print(f"🗓️  Makespan: {total_time/60:.1f} min actual vs {predicted_makespan/60:.1f} min predicted")
     print(f"📈 Average: {total_time/len(eij_files):.1f} seconds per file")
+    print(f"💾 Read: {total_bytes_read/1e9:.2f} GB | Written: {total_bytes_written/1e9:.2f} GB")
+    if total_time > 0:
+        print(f"⚡ Throughput: {total_frames/total_time:.1f} frames/s "
+              f"({total_worker_time/total_time:.1f} workers busy on average)")
+    print("=" * 50)
+
+def lease_convert(input_dir, output_dir, work_dir, max_workers=6, scaling_method='linear', threads=1,
+                  tone_sequence=None, frames=None, output_format='png', writers=0, queue_depth=None,
+                  memory_cap=None, shards=1, shard=None, lease_seconds=lease_queue.DEFAULT_LEASE_SECONDS,
+                  retry_failed=False):
+    """
+    Convert .8ij files by claiming them from a shared lease work directory
+    (see lease_queue.py) instead of a fixed list, so any number of converter
+    processes on any number of nodes can drain the same input tree.
+
+    Work keys are files, or "file#i/N" frame ranges with shards > 1. A key
+    whose lease expired (crashed worker) is reclaimed and resumed frame by
+    frame. Completion is recorded in work_dir rather than the manifest; one
+    work_dir belongs to one set of conversion settings. Failed keys stay
+    failed unless retry_failed clears them first.
+    """
+    input_dir = Path(input_dir)
+    print(f"🔍 Scanning for .8ij files in {input_dir}")
+    eij_files = find_8ij_files(input_dir)
+    if shard is not None:
+        eij_files = sharding.select_shard(eij_files, shard, input_dir)
+    if not eij_files:
+        print("❌ No .8ij files found!")
+        return
+
+    settings = {
+        'scaling': scaling_method,
+        'tone_sequence': tone_sequence,
+        'frames': repr(frames) if frames is not None else None,
+        'format': output_format,
+        'output_dir': str(Path(output_dir).resolve()),
+        # Work keys depend on the frame range split
+        'shards': shards,
+    }
+    if not lease_queue.check_work_settings(work_dir, settings):
+        print(f"❌ {work_dir} was created for different conversion settings; use a new work directory")
+        return
+
+    # Largest first, so the big takes start early on whichever workers get them
+    eij_files.sort(key=lambda path: Path(path).stat().st_size, reverse=True)
+    jobs = {}
+    for eij_file in eij_files:
+        rel_key = str(Path(eij_file).relative_to(input_dir))
+        if shards > 1:
+            shard_ranges = prepare_shards(eij_file, shards, scaling_method, tone_sequence, frames, max_workers)
+        else:
+            shard_ranges = [(frames, None, None)]
+        for index, (shard_frames, count, _) in enumerate(shard_ranges):
+            if len(shard_ranges) > 1:
+                key = f"{rel_key}#{index}/{len(shard_ranges)}"
+                label = f" [shard {index + 1}/{len(shard_ranges)}, {count} frames]"
+            else:
+                key, label = rel_key, ""
+            jobs[key] = (eij_file, shard_frames, label)
+
+    queue = lease_queue.LeaseQueue(work_dir, lease_seconds=lease_seconds)
+    keys = list(jobs)
+    print(f"📁 {len(eij_files)} .8ij files, {len(keys)} work items")
+    print(f"🔒 Claiming work from {work_dir} as {queue.worker_id} (lease {lease_seconds:.0f}s)")
+    if retry_failed:
+        print(f"🔁 Retrying {queue.retry_failed(keys)} failed work item(s)")
+    status = queue.status(keys)
+    print(f"📋 Queue: {status['done']} done, {status['failed']} failed, {status['leased']} leased, "
+          f"{status['pending']} pending")
+    print()
+
+    stage_options = {'writers': writers, 'queue_depth': queue_depth, 'memory_cap': memory_cap}
+    poll = min(lease_seconds / 4, 10)
+    completed = 0
+    failed = 0
+    total_frames = 0
+    start_time = time.time()
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = {}
+            while True:
+                # Only claim as much work as there are free workers
+                while len(in_flight) < max_workers:
+                    lease = queue.claim_next(keys)
+                    if lease is None:
+                        break
+                    eij_file, shard_frames, label = jobs[lease.key]
+                    if lease.reclaimed:
+                        print(f"♻️  Reclaimed expired lease: {lease.key}")
+                    args = (eij_file, input_dir, output_dir, scaling_method, threads, tone_sequence,
+                            shard_frames, lease.reclaimed, output_format, stage_options, label)
+                    in_flight[executor.submit(process_single_file, args)] = lease
+
+                if not in_flight:
+                    if queue.all_finished(keys):
+                        break
+                    # Everything left is leased by other workers: wait for them or for expiry
+                    time.sleep(poll)
+                    continue
+
+                finished, _ = wait(in_flight, timeout=poll, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    lease = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = pipeline.ExtractionResult(jobs[lease.key][0], error=str(e))
+
+                    if result.complete:
+                        completed += 1
+                        total_frames += result.frames_written
+                        lease.complete({'frames_done': result.frames_written + result.frames_skipped,
+                                        'elapsed': round(result.elapsed, 3)})
+                    else:
+                        failed += 1
+                        error = result.error or f"{result.frames_failed} frame(s) failed"
+                        print(f"   Error details: {error}")
+                        lease.fail(error[-2000:])
+                    if lease.lost.is_set():
+                        print(f"⚠️  Lease on {lease.key} was taken over by another worker")
+
+                print(f"📊 This worker: {completed} ✅, {failed} ❌ | Frames: {total_frames}")
+    finally:
+        queue.close()
+
+    total_time = time.time() - start_time
+    status = queue.status(keys)
+    print()
+    print("=" * 50)
+    print(f"🏁 Queue drained in {total_time/60:.1f} minutes")
+    print(f"✅ This worker: {completed} work items, {total_frames} frames ({failed} failed)")
+    print(f"📋 All workers: {status['done']} done, {status['failed']} failed")
     print("=" * 50)
 
 def main():
@@ -141,15 +468,56 @@ def main():
     parser.add_argument('output_dir', help='Output directory for PNG files')
     parser.add_argument('--workers', type=int, default=6,
                        help='Number of parallel workers (default: 6)')
-    parser.add_argument('--scaling', choices=['linear', 'auto', 'percentile'],
-                       default='linear', help='Brightness scaling method')
+    parser.add_argument('--scaling', type=pipeline.scaling_method_arg, default='linear',
+                       help='Brightness scaling method: linear, auto, percentile, gamma[:G] or log[:K]')
+    parser.add_argument('--format', type=pipeline.output_format_arg, default='png',
+                       help='Output format: png[:LEVEL], png16[:LEVEL], tiff, qoi, webp or jpeg[:QUALITY]')
+    parser.add_argument('--tone-sequence', type=pipeline.tone_sequence_arg, default=None,
+                       help="For auto/percentile: 'global' or a rolling N-frame window (default: per frame)")
+    parser.add_argument('--frames', type=pipeline.frame_selection_arg, default=None,
+                       help='Frame indices to extract from every file, e.g. 4000:4100, ::10 or 5,17,200:400')
+    parser.add_argument('--force', action='store_true',
+                       help='Reconvert every file, ignoring the completion manifest in the output directory')
+    parser.add_argument('--threads', type=int, default=1,
+                       help='Frames decoded concurrently within each file (default: 1)')
+    parser.add_argument('--shards', type=int, default=1,
+                       help='Split each file into up to N contiguous frame ranges converted by '
+                            'separate workers, for takes too large for one worker (default: 1)')
+    sharding.add_shard_argument(parser)
+    parser.add_argument('--schedule', choices=['largest', 'glob'], default='largest',
+                       help='File order: largest (longest predicted time first, from past runs or '
+                            'file size) or glob (discovery order) (default: largest)')
+    parser.add_argument('--writers', type=int, default=0,
+                       help='Encoder/writer threads per file; > 0 runs separate read/decode/write '
+                            'stages with bounded queues (default: 0)')
+    parser.add_argument('--queue-depth', type=int, default=None,
+                       help='Frames queued between stages (default: 2 * threads)')
+    parser.add_argument('--memory-cap', type=pipeline.memory_cap_arg, default=None,
+                       help='Max MB of frame data held between stages, per file (default: unlimited)')
+    parser.add_argument('--work-dir', default=None,
+                       help='Shared directory to claim work from with leases, so any number of converter '
+                            'processes/nodes can drain the same input (default: off, use the manifest)')
+    parser.add_argument('--lease-seconds', type=float, default=lease_queue.DEFAULT_LEASE_SECONDS,
+                       help=f'Lease lifetime without a heartbeat before work is reclaimed '
+                            f'(default: {lease_queue.DEFAULT_LEASE_SECONDS})')
+    parser.add_argument('--retry-failed', action='store_true',
+                       help='With --work-dir: clear failed work items so they are claimed again')
 
     args = parser.parse_args()
 
     # Ensure output directory exists
     Path(args.output_dir).mkdir(parents=True, exist_ok=True)
 
-    parallel_convert(args.input_dir, args.output_dir, args.workers, args.scaling)
+    if args.work_dir:
+        lease_convert(args.input_dir, args.output_dir, args.work_dir, args.workers, args.scaling,
+                      args.threads, args.tone_sequence, args.frames, args.format, args.writers,
+                      args.queue_depth, args.memory_cap, args.shards, args.shard, args.lease_seconds,
+                      args.retry_failed)
+        return
+
+    parallel_convert(args.input_dir, args.output_dir, args.workers, args.scaling, args.threads,
+                     args.tone_sequence, args.frames, args.force, args.format, args.writers,
+                     args.queue_depth, args.memory_cap, args.schedule, args.shards, args.shard)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Quick previews of .8ij captures - a contact sheet of evenly spaced frames per file.
+
+Only a handful of frames are decoded, at reduced resolution (1/8 by default).
+Decoders with JPEG DCT scaling make these decodes much cheaper than full
+ones; otherwise frames are decoded in full and averaged down.
+
+Usage:
+    python preview_8ij.py capture.8ij previews/
+    python preview_8ij.py /path/to/captures previews/ --count 24 --scale 4
+    python preview_8ij.py capture.8ij previews/ --frames 4000:4100:10 --thumbnails
+"""
+
+import sys
+import math
+import argparse
+from pathlib import Path
+import numpy as np
+from PIL import Image, ImageDraw
+
+from eij_pipeline import pipeline
+
+DEFAULT_COUNT = 16
+DEFAULT_SCALE = 8
+
+def pick_preview_frames(input_path, count=DEFAULT_COUNT, frames=None):
+    """Frame indices to preview: `count` evenly spaced frames of the (selected) frames."""
+    wanted = pipeline.as_frame_filter(frames)
+    indices = [entry.index for entry in pipeline.load_frame_index(input_path)['frames']
+               if wanted is None or entry.index in wanted]
+    if len(indices) <= count:
+        return indices
+    if count <= 1:
+        return indices[:count]
+    return [indices[round(i * (len(indices) - 1) / (count - 1))] for i in range(count)]
+
+def make_contact_sheet(thumbnails, columns=None, label=True):
+    """Tile (frame_index, uint8 array) thumbnails into one RGB PIL image, labelled with frame indices."""
+    columns = columns or math.ceil(math.sqrt(len(thumbnails)))
+    rows = math.ceil(len(thumbnails) / columns)
+    height = max(img.shape[0] for _, img in thumbnails)
+    width = max(img.shape[1] for _, img in thumbnails)
+
+    sheet = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+    for position, (_, img) in enumerate(thumbnails):
+        if img.ndim == 2:
+            img = img[:, :, np.newaxis]
+        row, col = divmod(position, columns)
+        sheet[row * height:row * height + img.shape[0], col * width:col * width + img.shape[1]] = img[:, :, :3]
+
+    sheet_image = Image.fromarray(sheet, mode='RGB')
+    if label:
+        draw = ImageDraw.Draw(sheet_image)
+        for position, (frame_index, _) in enumerate(thumbnails):
+            row, col = divmod(position, columns)
+            draw.text((col * width + 3, row * height + 2), str(frame_index), fill=(255, 255, 0))
+    return sheet_image
+
+def preview_8ij(input_path, output_dir, count=DEFAULT_COUNT, scale=DEFAULT_SCALE, scaling_method='auto',
+                frames=None, columns=None, thumbnails=False, threads=2):
+    """Write {stem}_preview.png (and optionally per-frame thumbnails) for one .8ij file."""
+    input_path = Path(input_path)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    chosen = pick_preview_frames(input_path, count, frames)
+    if not chosen:
+        print(f"  ❌ No frames to preview in {input_path}")
+        return None
+
+    decoded = list(pipeline.iter_frames(input_path, frames=set(chosen), scaling=scaling_method,
+                                        threads=threads, scale=scale))
+    if not decoded:
+        print(f"  ❌ No frames could be decoded from {input_path}")
+        return None
+
+    if thumbnails:
+        for frame_index, img in decoded:
+            Image.fromarray(img).save(output_dir / f"{input_path.stem}_thumb_{frame_index:06d}.png", 'PNG')
+
+    sheet_path = output_dir / f"{input_path.stem}_preview.png"
+    make_contact_sheet(decoded, columns).save(sheet_path, 'PNG')
+    print(f"  ✓ {len(decoded)} frames → {sheet_path}")
+    return sheet_path
+
+def main():
+    parser = argparse.ArgumentParser(description='Contact-sheet previews of .8ij files from reduced-resolution decodes')
+    parser.add_argument('input', help='Input .8ij file or directory')
+    parser.add_argument('output', help='Output directory for previews')
+    parser.add_argument('--count', type=int, default=DEFAULT_COUNT,
+                       help=f'Evenly spaced frames per preview (default: {DEFAULT_COUNT})')
+    parser.add_argument('--scale', type=pipeline.decode_scale_arg, default=DEFAULT_SCALE,
+                       help=f'Decode at 1/2, 1/4 or 1/8 resolution (default: {DEFAULT_SCALE})')
+    parser.add_argument('--scaling', type=pipeline.scaling_method_arg, default='auto',
+                       help='Brightness scaling method: linear, auto, percentile, gamma[:G] or log[:K] '
+                            '(default: auto)')
+    parser.add_argument('--frames', type=pipeline.frame_selection_arg, default=None,
+                       help='Only preview from these frame indices, e.g. 4000:4100 or ::10')
+    parser.add_argument('--columns', type=int, default=None,
+                       help='Contact sheet columns (default: square-ish grid)')
+    parser.add_argument('--thumbnails', action='store_true',
+                       help='Also write each previewed frame as its own thumbnail PNG')
+    parser.add_argument('--threads', type=int, default=2,
+                       help='Threads decoding frames (default: 2)')
+
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    if input_path.is_file():
+        eij_files = [input_path]
+    elif input_path.is_dir():
+        eij_files = sorted(input_path.glob('**/*.8ij'))
+    else:
+        print(f"Error: {input_path} is not a valid file or directory")
+        sys.exit(1)
+
+    if not eij_files:
+        print(f"No .8ij files found in {input_path}")
+        return
+
+    print(f"Previewing {len(eij_files)} .8ij file(s) at 1/{args.scale} resolution")
+    for eij_file in eij_files:
+        print(f"Processing: {eij_file}")
+        try:
+            preview_8ij(eij_file, args.output, args.count, args.scale, args.scaling, args.frames,
+                        args.columns, args.thumbnails, args.threads)
+        except Exception as e:
+            print(f"  ✗ Error previewing {eij_file}: {e}")
+
+if __name__ == '__main__':
+    main()
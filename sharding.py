@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Static work sharding across nodes - split a discovered work list into N
+disjoint parts without any coordination between the nodes.
+
+Each item is assigned to a shard by a stable hash of its path relative to
+the input root, so every node that sees the same tree (e.g. over NFS)
+agrees on the split, whatever order files were discovered in and wherever
+the tree is mounted.
+
+Shards are written "i/N" with 0 <= i < N. Scripts take --shard i/N and
+fall back to the SHARD environment variable, so containers can be scaled
+out by giving each one a different SHARD:
+
+    SHARD=0/4 python parallel_8ij_converter_fixed.py /captures /frames
+    SHARD=1/4 python parallel_8ij_converter_fixed.py /captures /frames
+    ...
+"""
+
+import os
+import hashlib
+import argparse
+from pathlib import Path, PurePath
+
+SHARD_ENV = 'SHARD'
+
+def parse_shard(spec):
+    """Parse 'i/N' into (i, N). Returns None for an empty spec (no sharding)."""
+    if not spec:
+        return None
+    index, sep, count = str(spec).partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N (e.g. 0/4)") from None
+    if not sep or count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N with 0 <= i < N")
+    return index, count
+
+def shard_arg(value):
+    """argparse type for --shard."""
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+def add_shard_argument(parser):
+    """Add --shard i/N to an argparse parser, defaulting to the SHARD environment variable."""
+    default = os.getenv(SHARD_ENV)
+    try:
+        default = parse_shard(default)
+    except ValueError as e:
+        parser.error(f"{SHARD_ENV} environment variable: {e}")
+    parser.add_argument('--shard', type=shard_arg, default=default,
+                       help=f'Only process shard i of N (0-based, e.g. 0/4) of the discovered work, '
+                            f'split by a stable hash of each relative path (default: ${SHARD_ENV} or all)')
+
+def shard_of(rel_path, count):
+    """Shard number (0..count-1) of a relative path; identical on every node and OS."""
+    key = PurePath(rel_path).as_posix().encode('utf-8')
+    return int.from_bytes(hashlib.sha1(key).digest()[:8], 'big') % count
+
+def in_shard(rel_path, shard):
+    """True if rel_path belongs to shard (i, N); everything belongs to shard None."""
+    return shard is None or shard_of(rel_path, shard[1]) == shard[0]
+
+def select_shard(paths, shard, root):
+    """Keep the paths under root whose path relative to root falls in shard, in their original order."""
+    if shard is None:
+        return list(paths)
+    root = Path(root)
+    return [path for path in paths if in_shard(Path(path).relative_to(root), shard)]
+
+def format_shard(shard):
+    """Human-readable shard, e.g. '1/4'."""
+    return f"{shard[0]}/{shard[1]}"
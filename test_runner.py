@@ -338,6 +338,542 @@ class AlphaMaskTester:
             print(f"  ❌ Docker test error: {e}")
             return False
 
+    def test_preprocessing_parity(self) -> bool:
+        """Check the tensor-native preprocessing path against the PIL path in birefnet_engine.py."""
+        print("🔬 Testing preprocessing parity (tensor vs PIL)...")
+
+        try:
+            import numpy as np
+            import birefnet_engine as engine
+        except ImportError as e:
+            print(f"  ⚠️  Skipped - {e}")
+            return None
+
+        input_size = (1024, 1024)
+        # Differences in 8-bit levels of the resized image; LANCZOS and
+        # antialiased bicubic differ slightly, mostly on hard edges
+        max_mean_diff = 1.0
+        max_p999_diff = 12.0
+
+        # Downscaled 4K, roughly model-sized and upscaled inputs
+        images = [
+            ("large", self._create_large_image((3840, 2160))),
+            ("person", self._create_person_image((1024, 768))),
+            ("complex", self._create_complex_image((1920, 1080))),
+            ("dark", self._create_dark_image((800, 600))),
+            ("small", self._create_small_image((320, 240))),
+        ]
+
+        scale = engine.NORM_SCALE.numpy()
+        passed = True
+        for name, img in images:
+            reference, reference_size = engine.preprocess_image(img, input_size)
+            pixels, size = engine.resize_image_tensor(img, input_size)
+            tensor = engine.normalize_batch(pixels.unsqueeze(0))[0]
+
+            if size != reference_size or tensor.shape != reference.shape:
+                print(f"  ❌ {name}: shape {tuple(tensor.shape)} vs {tuple(reference.shape)}")
+                passed = False
+                continue
+
+            diff = np.abs(tensor.numpy() - reference.numpy()) / scale
+            mean_diff = diff.mean()
+            p999_diff = np.percentile(diff, 99.9)
+            ok = mean_diff <= max_mean_diff and p999_diff <= max_p999_diff
+            passed = passed and ok
+            print(f"  {'✅' if ok else '❌'} {name} {img.size[0]}x{img.size[1]}: mean diff {mean_diff:.3f}, "
+                  f"99.9th pct {p999_diff:.2f} levels")
+
+        return passed
+
+    def test_threshold_parity(self) -> bool:
+        """Check threshold_upsample against full-resolution interpolation (_threshold_interpolate) in birefnet_engine.py."""
+        print("🔬 Testing thresholded mask upsampling parity...")
+
+        try:
+            import numpy as np
+            import torch
+            import torch.nn.functional as F
+            import birefnet_engine as engine
+        except ImportError as e:
+            print(f"  ⚠️  Skipped - {e}")
+            return None
+
+        generator = torch.Generator().manual_seed(0)
+
+        def blob(height, width):
+            # Smooth subject-like logits: few boundary cells, so the band path runs
+            yy, xx = torch.meshgrid(torch.linspace(-1, 1, height), torch.linspace(-1, 1, width), indexing='ij')
+            distance = 0.5 - torch.sqrt((xx * 1.3) ** 2 + (yy + 0.2) ** 2)
+            return (distance * 60 + torch.randn(height, width, generator=generator) * 0.3)[None]
+
+        def noisy(height, width):
+            # Boundary cells well above MAX_BAND_FRACTION, so the full-resolution fallback runs
+            low = torch.randn(1, 1, height // 16 + 1, width // 16 + 1, generator=generator) * 8
+            smooth = F.interpolate(low, size=(height, width), mode='bicubic')[0]
+            return smooth + torch.randn(1, height, width, generator=generator) * 0.5
+
+        # (logits, output size (w, h), threshold 0-255, expected path)
+        cases = [
+            ("blob", blob(1024, 1024), (3840, 2160), 128, 'band'),
+            ("blob", blob(256, 256), (1000, 777), 200, 'band'),
+            ("blob", blob(64, 48), (1001, 999), 60, 'band'),
+            ("blob", blob(256, 256), (255, 257), 128, 'plain'),
+            ("blob", blob(256, 256), (1920, 1080), 1, 'band'),
+            ("noisy", noisy(256, 256), (1920, 1080), 128, 'plain'),
+            ("noisy", noisy(512, 384), (1000, 1000), 100, 'plain'),
+        ]
+
+        # Count fallbacks to the full-resolution path to check which branch each case took
+        reference = engine._threshold_interpolate
+        fallbacks = []
+        def counting_interpolate(*args):
+            fallbacks.append(args)
+            return reference(*args)
+
+        passed = True
+        engine._threshold_interpolate = counting_interpolate
+        try:
+            for name, logits, size, threshold, expected_path in cases:
+                del fallbacks[:]
+                alpha = engine.threshold_upsample(logits, size, threshold / 255.0)
+                path = 'plain' if fallbacks else 'band'
+                expected = reference(logits[0], size, threshold / 255.0)
+                mismatched = int(np.count_nonzero(alpha != expected)) if alpha.shape == expected.shape else -1
+                ok = mismatched == 0 and path == expected_path
+                passed = passed and ok
+                print(f"  {'✅' if ok else '❌'} {name} {logits.shape[2]}x{logits.shape[1]} → {size[0]}x{size[1]}, "
+                      f"threshold {threshold} ({path} path): {mismatched} mismatched pixels")
+        finally:
+            engine._threshold_interpolate = reference
+
+        return passed
+
+    def test_tone_parity(self) -> bool:
+        """Check the LUT tone conversion and histogram percentiles in 8ij_to_png_pipeline.py against plain NumPy."""
+        print("🔬 Testing tone LUT and histogram percentile parity...")
+
+        try:
+            import numpy as np
+            from eij_pipeline import pipeline
+        except ImportError as e:
+            print(f"  ⚠️  Skipped - {e}")
+            return None
+
+        def reference(img_array, method):
+            # Per-pixel float scaling, as convert_12bit_to_8bit did before tone LUTs
+            if method == 'linear':
+                return (img_array.astype(np.float32) * (255.0 / 4095.0)).astype(np.uint8)
+            if method == 'auto':
+                low, high = np.min(img_array), np.max(img_array)
+            else:
+                low, high = np.percentile(img_array, 2), np.percentile(img_array, 98)
+            if high > low:
+                return np.clip((img_array - low) * (255.0 / (high - low)), 0, 255).astype(np.uint8)
+            return np.zeros_like(img_array, dtype=np.uint8)
+
+        rng = np.random.default_rng(0)
+        frames = [
+            ("uniform", rng.integers(0, 4096, size=(120, 160))),
+            ("dim", rng.normal(300, 40, size=(120, 160)).clip(0, 4095)),
+            ("clipped", rng.normal(3900, 300, size=(97, 131)).clip(0, 4095)),
+            ("sparse", rng.choice([0, 17, 2048, 4095], size=(33, 47), p=[0.5, 0.3, 0.15, 0.05])),
+            ("flat", np.full((16, 16), 1234)),
+            ("tiny", np.array([[5, 4000]])),
+        ]
+
+        passed = True
+        for name, values in frames:
+            img_array = values.astype(np.uint16)
+            hist = pipeline.compute_histogram(img_array)
+            mismatched = {}
+            for method in ('linear', 'auto', 'percentile'):
+                expected = reference(img_array, method)
+                for label, converted in ((method, pipeline.convert_12bit_to_8bit(img_array, method)),
+                                         (f"{method}+hist", pipeline.convert_12bit_to_8bit(img_array, method,
+                                                                                        hist=hist))):
+                    mismatched[label] = int(np.count_nonzero(converted != expected))
+
+            percentiles = (0, 0.5, 2, 25, 50, 73.3, 98, 99.9, 100)
+            percentile_errors = [abs(pipeline.histogram_percentile(hist, q) - np.percentile(img_array, q))
+                                 for q in percentiles]
+            ok = not any(mismatched.values()) and max(percentile_errors) == 0
+            passed = passed and ok
+            bad = ", ".join(f"{label}: {count}" for label, count in mismatched.items() if count)
+            print(f"  {'✅' if ok else '❌'} {name} {img_array.shape[1]}x{img_array.shape[0]}: "
+                  f"{'LUTs match' if not bad else 'mismatched pixels ' + bad}, "
+                  f"max percentile error {max(percentile_errors):g}")
+
+        return passed
+
+    def _write_synthetic_8ij(self, path, indices, shape=(48, 64)):
+        """Write a .8ij whose frames are real 12-bit JPEGs of a gradient that changes per frame."""
+        import struct
+        import numpy as np
+        import imagecodecs
+        from eij_pipeline import pipeline
+
+        with open(path, 'wb') as f:
+            for index in indices:
+                frame = ((np.arange(shape[0] * shape[1]).reshape(shape) * (index + 1)) % 4096).astype(np.uint16)
+                data = imagecodecs.jpeg_encode(frame, level=95)
+                f.write(pipeline.FRAME_ID + struct.pack('<II', len(data), index) + data)
+
+    def test_resume(self) -> bool:
+        """Check atomic frame writes, skip_existing resume and the conversion manifest on a synthetic .8ij."""
+        print("🔬 Testing .8ij conversion resume...")
+
+        try:
+            import os
+            import tempfile
+            from eij_pipeline import pipeline
+        except ImportError as e:
+            print(f"  ⚠️  Skipped - {e}")
+            return None
+        if not pipeline.HAVE_IMAGECODECS:
+            print("  ⚠️  Skipped - imagecodecs not available")
+            return None
+
+        checks = []
+        with tempfile.TemporaryDirectory() as tmp:
+            eij_path = Path(tmp) / "take.8ij"
+            output_dir = Path(tmp) / "frames"
+            indices = list(range(8))
+            self._write_synthetic_8ij(eij_path, indices)
+            names = [f"take_frame_{index:06d}.png" for index in indices]
+
+            # A write that dies mid-frame must not leave a frame file behind
+            encode_frame = pipeline.encode_frame
+            def interrupted_encode(img_array, output_path, output_format='png'):
+                if '_frame_000005' in output_path.name:
+                    output_path.write_bytes(b'partial')
+                    raise IOError("disk went away")
+                return encode_frame(img_array, output_path, output_format)
+
+            pipeline.encode_frame = interrupted_encode
+            try:
+                first = pipeline.process_8ij_file(eij_path, output_dir)
+            finally:
+                pipeline.encode_frame = encode_frame
+            # The failure aborts the file, so only the frames before it are done
+            on_disk = sorted(name for name in os.listdir(output_dir) if not name.startswith('.'))
+            checks.append(("interrupted frame leaves no frame file",
+                           not first and on_disk == names[:5]))
+
+            # Resume: existing frames are skipped (and left untouched), missing ones written
+            (output_dir / names[2]).unlink()
+            kept_mtime = (output_dir / names[0]).stat().st_mtime_ns
+            resumed = pipeline.process_8ij_file(eij_path, output_dir, skip_existing=True)
+            on_disk = sorted(name for name in os.listdir(output_dir) if not name.startswith('.'))
+            checks.append(("skip_existing resumes only missing frames",
+                           resumed.complete and resumed.frames_written == 4 and resumed.frames_skipped == 4
+                           and on_disk == names and (output_dir / names[0]).stat().st_mtime_ns == kept_mtime))
+
+            # Manifest: atomic save, round-trip, and matching on source and settings
+            settings = {'scaling': 'linear', 'frames': None, 'format': 'png'}
+            manifest = pipeline.load_manifest(output_dir)
+            manifest['files']['take.8ij'] = pipeline.manifest_entry(eij_path, settings, resumed)
+            pipeline.save_manifest(output_dir, manifest)
+            entry = pipeline.load_manifest(output_dir)['files'].get('take.8ij')
+            # The resumed write of the interrupted frame replaced its temporary file too
+            leftovers = [name for name in os.listdir(output_dir) if name.endswith('.tmp')]
+            checks.append(("manifest saved atomically and reloaded",
+                           entry is not None and entry['complete'] and entry['frames_done'] == 8 and not leftovers))
+            stat = eij_path.stat()
+            os.utime(eij_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            checks.append(("manifest entry matches only the same source and settings",
+                           not pipeline.manifest_entry_matches(entry, eij_path, settings)
+                           and pipeline.manifest_entry_matches(pipeline.manifest_entry(eij_path, settings, resumed),
+                                                               eij_path, settings)
+                           and not pipeline.manifest_entry_matches(pipeline.manifest_entry(eij_path, settings, resumed),
+                                                                   eij_path, dict(settings, scaling='auto'))))
+
+        for name, ok in checks:
+            print(f"  {'✅' if ok else '❌'} {name}")
+        return all(ok for _, ok in checks)
+
+    def test_frame_store(self) -> bool:
+        """Check the FrameStoreWriter/FrameStore round-trip for each codec, directly and from a synthetic .8ij."""
+        print("🔬 Testing chunked frame store round-trip...")
+
+        try:
+            import tempfile
+            import numpy as np
+            import frame_store
+            from eij_pipeline import pipeline
+        except ImportError as e:
+            print(f"  ⚠️  Skipped - {e}")
+            return None
+        if not pipeline.HAVE_IMAGECODECS:
+            print("  ⚠️  Skipped - imagecodecs not available")
+            return None
+
+        rng = np.random.default_rng(0)
+        frames = {index: rng.integers(0, 4096, size=(30, 40)).astype(np.uint16) for index in (3, 4, 9, 10, 11, 40)}
+
+        passed = True
+        with tempfile.TemporaryDirectory() as tmp:
+            eij_path = Path(tmp) / "take.8ij"
+            indices = list(range(7))
+            self._write_synthetic_8ij(eij_path, indices)
+
+            for codec in frame_store.CODECS:
+                if codec == 'zstd' and not frame_store.HAVE_ZSTD:
+                    print(f"  ⚠️  {codec}: skipped - imagecodecs without zstd")
+                    continue
+
+                # Direct writes: random access, ordered iteration and subsets across chunk boundaries
+                store_path = Path(tmp) / f"direct_{codec}{frame_store.STORE_SUFFIX}"
+                with frame_store.FrameStoreWriter(store_path, chunk_frames=4, codec=codec, source="test") as writer:
+                    for index, frame in frames.items():
+                        writer.add(index, frame)
+                store = frame_store.FrameStore(store_path)
+                direct_ok = (len(store) == len(frames) and store.frame_indices == list(frames)
+                             and all(np.array_equal(store[index], frame) for index, frame in frames.items())
+                             and [index for index, _ in store.iter_frames({4, 11, 40})] == [4, 11, 40]
+                             and 5 not in store)
+
+                # Extraction: raw 12-bit (png16) frames equal a direct decode, 8-bit frames the tone mapping
+                extracted_ok = True
+                for output_format in ('png16', 'png'):
+                    output_dir = Path(tmp) / f"{codec}_{output_format}"
+                    result = pipeline.process_8ij_to_store(eij_path, output_dir, output_format=output_format,
+                                                           chunk_frames=3, codec=codec, frames="1:")
+                    store = frame_store.FrameStore(pipeline.get_store_path(eij_path, output_dir))
+                    with pipeline.EijFile(eij_path) as eij:
+                        for entry, jpeg_data in eij:
+                            try:
+                                expected = pipeline.decode_12bit_jpeg(jpeg_data)
+                            finally:
+                                jpeg_data.release()
+                            if output_format == 'png':
+                                expected = pipeline.convert_12bit_to_8bit(expected)
+                            if entry.index == 0:
+                                extracted_ok = extracted_ok and entry.index not in store
+                            else:
+                                extracted_ok = extracted_ok and np.array_equal(store[entry.index], expected)
+                    extracted_ok = extracted_ok and result.complete and store.frame_indices == indices[1:]
+
+                ok = direct_ok and extracted_ok
+                passed = passed and ok
+                print(f"  {'✅' if ok else '❌'} {codec}: direct round-trip {'ok' if direct_ok else 'FAILED'}, "
+                      f".8ij extraction {'ok' if extracted_ok else 'FAILED'}")
+
+        return passed
+
+    def test_frame_selection(self) -> bool:
+        """Check FrameSelection parsing of --frames specs: ranges, steps, single indices and bad specs."""
+        print("🔬 Testing --frames selection parsing...")
+
+        try:
+            from eij_pipeline import pipeline
+        except ImportError as e:
+            print(f"  ⚠️  Skipped - {e}")
+            return None
+
+        # spec -> (indices that must be selected, indices that must not)
+        cases = {
+            "4000:4100": ([4000, 4050, 4099], [3999, 4100]),
+            "::10": ([0, 10, 990], [5, 11]),
+            "5:": ([5, 6, 10 ** 6], [0, 4]),
+            ":3": ([0, 1, 2], [3]),
+            "0:200:2,500,750:": ([0, 198, 500, 750, 751], [199, 200, 501, 749]),
+            " 5 , 17 ": ([5, 17], [6, 16]),
+            "10:20:4,12": ([10, 12, 14, 18], [11, 13, 20, 22]),
+        }
+        bad_specs = ["", ",", "1:2:3:4", "-1", "5:-2", "::0", "a:b", "1.5", "3:x"]
+
+        passed = True
+        for spec, (selected, excluded) in cases.items():
+            try:
+                selection = pipeline.FrameSelection.parse(spec)
+                # repr round-trips to the same selection (it is stored in manifest settings)
+                reparsed = pipeline.FrameSelection.parse(repr(selection).split("'")[1])
+                ok = (all(index in selection and index in reparsed for index in selected)
+                      and not any(index in selection or index in reparsed for index in excluded))
+            except ValueError:
+                ok = False
+            passed = passed and ok
+            print(f"  {'✅' if ok else '❌'} {spec!r}")
+
+        rejected = []
+        for spec in bad_specs:
+            try:
+                pipeline.FrameSelection.parse(spec)
+            except ValueError:
+                rejected.append(spec)
+        ok = rejected == bad_specs
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {len(rejected)}/{len(bad_specs)} bad specs rejected")
+
+        return passed
+
+    def test_frame_range_split(self) -> bool:
+        """Check that split_frame_ranges covers every frame of a .8ij whose frame indices reset."""
+        print("🔬 Testing .8ij frame range split...")
+
+        try:
+            import struct
+            import tempfile
+            from eij_pipeline import pipeline
+        except ImportError as e:
+            print(f"  ⚠️  Skipped - {e}")
+            return None
+
+        # Indices restart mid-capture (100-109, then 0-9); only the headers
+        # are read, so the payloads needn't be real JPEGs
+        indices = list(range(100, 110)) + list(range(10))
+
+        passed = True
+        with tempfile.TemporaryDirectory() as tmp:
+            eij_path = Path(tmp) / "reset.8ij"
+            with open(eij_path, 'wb') as f:
+                for position, index in enumerate(indices):
+                    payload = bytes(100 + 37 * (position % 5))
+                    f.write(pipeline.FRAME_ID + struct.pack('<II', len(payload), index) + payload)
+
+            for shards in (1, 2, 3, 7):
+                ranges = pipeline.split_frame_ranges(eij_path, shards)
+                covered = [index for index in indices if any(index in run for run, _, _ in ranges)]
+                counts = [sum(index in run for index in indices) for run, _, _ in ranges]
+                ok = (covered == indices and sum(counts) == len(indices)
+                      and counts == [count for _, count, _ in ranges])
+                passed = passed and ok
+                print(f"  {'✅' if ok else '❌'} {shards} shard(s): {len(ranges)} range(s), "
+                      f"{len(covered)}/{len(indices)} frames covered, counts {counts}")
+
+        return passed
+
+    def test_lease_queue(self) -> bool:
+        """Check lease_queue.py claiming, heartbeats, expiry, retries and work dir settings in a temp work dir."""
+        print("🔬 Testing lease work queue...")
+
+        try:
+            import tempfile
+            import threading
+            import lease_queue
+        except ImportError as e:
+            print(f"  ⚠️  Skipped - {e}")
+            return None
+
+        checks = []
+        with tempfile.TemporaryDirectory() as work_dir:
+            # Two claimers draining the same keys concurrently: every key claimed exactly once
+            keys = [f"take{i:02d}.8ij" for i in range(40)]
+            claimed = []
+            claimed_lock = threading.Lock()
+
+            def drain(worker_id):
+                queue = lease_queue.LeaseQueue(work_dir, worker_id=worker_id, lease_seconds=30)
+                try:
+                    for lease in queue.drain(keys, poll=0.05):
+                        with claimed_lock:
+                            claimed.append(lease.key)
+                        lease.complete()
+                finally:
+                    queue.close()
+
+            claimers = [threading.Thread(target=drain, args=(f"claimer-{i}",)) for i in range(2)]
+            for claimer in claimers:
+                claimer.start()
+            for claimer in claimers:
+                claimer.join()
+            checks.append(("each key claimed once by two claimers", sorted(claimed) == keys))
+
+            first = lease_queue.LeaseQueue(work_dir, worker_id='first', lease_seconds=0.6)
+            second = lease_queue.LeaseQueue(work_dir, worker_id='second', lease_seconds=0.6)
+            try:
+                # A live lease is renewed by its heartbeat and can't be taken over
+                lease = first.try_claim('live')
+                time.sleep(1.5)
+                checks.append(("heartbeat keeps a lease past lease_seconds",
+                               lease is not None and second.try_claim('live') is None and not lease.lost.is_set()))
+                lease.release()
+
+                # A lease whose holder stopped heartbeating (crashed) expires and is reclaimed
+                crashed = first.try_claim('crashed')
+                crashed._stop.set()
+                crashed._thread.join()
+                time.sleep(1.0)
+                reclaimed = second.try_claim('crashed')
+                checks.append(("expired lease is reclaimed", reclaimed is not None and reclaimed.reclaimed))
+                if reclaimed is not None:
+                    reclaimed.complete()
+
+                # A failed key stays failed until retry_failed clears it
+                failed = first.try_claim('failed')
+                failed.fail('synthetic failure')
+                stays_failed = second.try_claim('failed') is None and second.status(['failed'])['failed'] == 1
+                cleared = second.retry_failed(['failed', 'live'])
+                retried = second.try_claim('failed')
+                checks.append(("failed key comes back after retry_failed",
+                               stays_failed and cleared == 1 and retried is not None))
+                if retried is not None:
+                    retried.complete()
+            finally:
+                first.close()
+                second.close()
+
+            # A work dir is tied to the settings it was created with
+            settings = {'scaling': 'linear', 'shards': 2}
+            checks.append(("work dir settings mismatch is rejected",
+                           lease_queue.check_work_settings(work_dir, settings)
+                           and lease_queue.check_work_settings(work_dir, dict(settings))
+                           and not lease_queue.check_work_settings(work_dir, dict(settings, shards=3))))
+
+        for name, ok in checks:
+            print(f"  {'✅' if ok else '❌'} {name}")
+        return all(ok for _, ok in checks)
+
+    def test_tone_lut_dtypes(self) -> bool:
+        """Check that tone conversion of wide, signed and float sample arrays matches uint16 input."""
+        print("🔬 Testing tone conversion input dtypes...")
+
+        try:
+            import numpy as np
+            from eij_pipeline import pipeline
+        except ImportError as e:
+            print(f"  ⚠️  Skipped - {e}")
+            return None
+
+        levels = np.random.default_rng(0).integers(0, pipeline.LUT_SIZE, size=(48, 64)).astype(np.uint16)
+        passed = True
+        for dtype in (np.int64, np.int32, np.uint32, np.int16, np.float32):
+            samples = levels.astype(dtype)
+            try:
+                same = all(np.array_equal(pipeline.convert_12bit_to_8bit(samples, method),
+                                          pipeline.convert_12bit_to_8bit(levels, method))
+                           for method in ('linear', 'auto', 'percentile'))
+                # Out-of-range samples saturate instead of indexing past (or wrapping around) the LUT
+                low = [0] + ([-7] if not np.issubdtype(dtype, np.unsignedinteger) else [])
+                high = [4095, 5000] + ([2 ** 40] if dtype == np.int64 else [])
+                converted = pipeline.convert_12bit_to_8bit(np.array([low + high], dtype=dtype), 'linear')[0]
+                saturated = (converted[:len(low)] == 0).all() and (converted[len(low):] == 255).all()
+                ok = bool(same and saturated)
+                detail = (f"{'matches' if same else 'differs from'} uint16, out-of-range samples "
+                          f"{'saturate' if saturated else 'do not saturate'}")
+            except (MemoryError, ValueError, IndexError) as e:
+                ok = False
+                detail = f"{type(e).__name__}: {e}"
+            passed = passed and ok
+            print(f"  {'✅' if ok else '❌'} {np.dtype(dtype).name}: {detail}")
+
+        return passed
+
+    def run_pipeline_tests(self):
+        """Run the synthetic .8ij pipeline checks; returns None if all were skipped, else whether all passed."""
+        results = [
+            self.test_frame_selection(),
+            self.test_frame_range_split(),
+            self.test_resume(),
+            self.test_frame_store(),
+            self.test_tone_lut_dtypes(),
+            self.test_lease_queue(),
+        ]
+        if all(result is None for result in results):
+            return None
+        return False not in results
+
     def run_performance_tests(self):
         """Run performance benchmarking tests."""
         print("⚡ Running performance tests...")
@@ -378,6 +914,18 @@ class AlphaMaskTester:
             result = self.test_script_execution(script)
             script_results.append(result)
 
+        # Test preprocessing paths against each other
+        parity_result = self.test_preprocessing_parity()
+
+        # Test the thresholded upsampling against full-resolution interpolation
+        threshold_result = self.test_threshold_parity()
+
+        # Test the tone LUTs and histogram percentiles against plain NumPy
+        tone_result = self.test_tone_parity()
+
+        # Test the .8ij pipeline on synthetic captures
+        pipeline_result = self.run_pipeline_tests()
+
         # Test Docker if available
         docker_result = None
         if docker_available:
@@ -390,8 +938,13 @@ class AlphaMaskTester:
         print(f"  Docker available: {'Yes' if docker_available else 'No'}")
         print(f"  Docker test passed: {'Yes' if docker_result else 'No' if docker_result is not None else 'Skipped'}")
         print(f"  GPU available: {'Yes' if gpu_available else 'No'}")
+        print(f"  Preprocessing parity: {'Yes' if parity_result else 'No' if parity_result is not None else 'Skipped'}")
+        print(f"  Threshold parity: {'Yes' if threshold_result else 'No' if threshold_result is not None else 'Skipped'}")
+        print(f"  Tone parity: {'Yes' if tone_result else 'No' if tone_result is not None else 'Skipped'}")
+        print(f"  Pipeline checks: {'Yes' if pipeline_result else 'No' if pipeline_result is not None else 'Skipped'}")
 
-        overall_success = all(script_results) and (docker_result is not False)
+        overall_success = (all(script_results) and (docker_result is not False) and (parity_result is not False)
+                           and (threshold_result is not False) and (tone_result is not False) and (pipeline_result is not False))
         print(f"\n🎯 Overall Result: {'✅ PASS' if overall_success else '❌ FAIL'}")
 
         return overall_success
@@ -402,6 +955,11 @@ def main():
     parser.add_argument("--performance", action="store_true", help="Run performance tests")
     parser.add_argument("--edge-cases", action="store_true", help="Run edge case tests")
     parser.add_argument("--setup", action="store_true", help="Setup test environment only")
+    parser.add_argument("--parity", action="store_true",
+                        help="Run the preprocessing, threshold upsampling and tone parity tests only")
+    parser.add_argument("--frame-split", action="store_true", help="Run the .8ij frame range split test only")
+    parser.add_argument("--lease-queue", action="store_true", help="Run the lease work queue test only")
+    parser.add_argument("--pipeline", action="store_true", help="Run the synthetic .8ij pipeline checks only")
 
     args = parser.parse_args()
 
@@ -412,6 +970,15 @@ def main():
         tester.create_synthetic_test_images()
     elif args.performance:
         tester.run_performance_tests()
+    elif args.parity:
+        results = [tester.test_preprocessing_parity(), tester.test_threshold_parity(), tester.test_tone_parity()]
+        sys.exit(0 if False not in results else 1)
+    elif args.frame_split:
+        sys.exit(0 if tester.test_frame_range_split() is not False else 1)
+    elif args.lease_queue:
+        sys.exit(0 if tester.test_lease_queue() is not False else 1)
+    elif args.pipeline:
+        sys.exit(0 if tester.run_pipeline_tests() is not False else 1)
     elif args.all or len(sys.argv) == 1:
         tester.run_comprehensive_tests()
     else: